@@ -1,4 +1,19 @@
-from .main import app
-from . import config
-from . import database
-from . import schema
+import importlib
+
+from . import startup
+
+LAZY_SUBMODULES = {"config", "database", "schema"}
+
+
+def __getattr__(name: str):
+    # Building the ASGI app imports FastAPI and Strawberry and builds the
+    # schema, commands and workers that only need the database skip it.
+    if name == "app":
+        with startup.phase("import"):
+            from .main import app
+        # `from app import app` looks the name up twice, keep the first timing
+        globals()["app"] = app
+        return app
+    if name in LAZY_SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,53 @@
+"""Find the bcrypt work factor that fits a hashing time budget.
+
+    python -m app.commands.calibrate_bcrypt [--target-ms 250] [--runs 5]
+
+Prints the highest cost whose median hash time stays within the target on
+this machine, ready to be put into the environment as BCRYPT_ROUNDS.
+"""
+import argparse
+import statistics
+import time
+
+import bcrypt
+
+MIN_ROUNDS = 4
+MAX_ROUNDS = 20
+
+
+def measure(rounds: int, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        salt = bcrypt.gensalt(rounds=rounds)
+        started = time.perf_counter()
+        bcrypt.hashpw(b"calibration password", salt)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, runs: int) -> int:
+    chosen = MIN_ROUNDS
+    for rounds in range(MIN_ROUNDS, MAX_ROUNDS + 1):
+        elapsed = measure(rounds, runs)
+        print(f"rounds={rounds:<3}{elapsed:>10.1f} ms")
+        if elapsed > target_ms:
+            break
+        chosen = rounds
+        # Every extra round doubles the time, stop before a long run
+        if elapsed * 2 > target_ms:
+            break
+    return chosen
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target-ms", type=float, default=250)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    rounds = calibrate(args.target_ms, args.runs)
+    print(f"BCRYPT_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
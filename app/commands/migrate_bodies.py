@@ -0,0 +1,85 @@
+"""Move large inline article bodies into the article_bodies collection.
+
+    python -m app.commands.migrate_bodies [--batch-size 1000] [--vacuum]
+
+Bodies longer than BODY_EXTERNAL_THRESHOLD are compressed into chunks and
+removed from their article. Each article is updated only if its body did not
+change meanwhile, so the migration can run next to live traffic and can be
+rerun. With --vacuum, chunks that no article refers to anymore, left behind
+by writes interrupted before they could clean up, are removed too.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from app.config import settings
+from app.database import repository
+from app.database.db import run_db_setup
+
+# Bodies saved this recently may belong to an insert still in progress
+VACUUM_GRACE = timedelta(hours=1)
+
+
+async def vacuum(referenced: set[str], started: datetime) -> int:
+    orphans = set()
+    cursor = repository.article_bodies.collection.find({}, {"body_id": 1})
+    async for chunk in cursor:
+        body_id = chunk["body_id"]
+        if (
+            body_id not in referenced and
+            ObjectId(body_id).generation_time < started - VACUUM_GRACE
+        ):
+            orphans.add(body_id)
+
+    for body_id in orphans:
+        await repository.article_bodies.delete(body_id)
+    return len(orphans)
+
+
+async def migrate(batch_size: int = 1000, remove_orphans: bool = False) -> dict:
+    await run_db_setup()
+    started = datetime.now(timezone.utc)
+
+    result = {"moved": 0, "changed": 0, "removed": 0}
+    referenced = set()
+    async for document in repository.articles.iterate(batch_size=batch_size):
+        if document.get("body_id") is not None:
+            referenced.add(document["body_id"])
+            continue
+
+        body = document.get("body")
+        if body is None or len(body) <= settings.BODY_EXTERNAL_THRESHOLD:
+            continue
+
+        updated = await repository.articles.update_one(
+            {"_id": document["_id"], "body": body},
+            {"body": body},
+        )
+        if updated is None:
+            result["changed"] += 1
+        else:
+            result["moved"] += 1
+            referenced.add(updated.body_id)
+
+    if remove_orphans:
+        result["removed"] = await vacuum(referenced, started)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--vacuum", action="store_true")
+    args = parser.parse_args()
+
+    result = asyncio.run(migrate(args.batch_size, args.vacuum))
+    print(
+        f"{result['moved']} bodies moved, {result['changed']} changed meanwhile, "
+        f"{result['removed']} orphaned bodies removed"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Fill the database with deterministic synthetic users and articles.
+
+    python -m app.commands.seed --users 100000 --articles 1000000 [--seed 42]
+
+The same seed always produces the same documents, including their ids, so
+benchmark runs against seeded data stay comparable. Existing documents are
+kept, rerunning with the same seed only fills in what is missing.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import bcrypt
+from bson import ObjectId
+
+from app.config import settings
+from app.database import repository
+from app.database.db import run_db_setup
+from app.database.models import UserPermission
+
+WORDS = (
+    "the of and to in is that for it as was with be by on not he this are or "
+    "his from at which but have an they you were her she there been one all "
+    "would their we him has when who will more no if out so said what up its "
+    "about into than them can only other new some could time these two may "
+    "then do first any my now such like our over man me even most made after "
+    "also did many before must through back years where much your way well "
+    "down should because each just those people how too little state good "
+    "very make world still own see men work long get here between both life "
+    "being under never day same another know while last might us great old "
+    "year off come since against go came right used take three database "
+    "query index latency cache schema article server request response"
+).split()
+FIRST_NAMES = (
+    "Ada", "Alan", "Barbara", "Dennis", "Donald", "Edsger", "Frances", "Grace",
+    "John", "Ken", "Leslie", "Linus", "Margaret", "Niklaus", "Radia", "Tim",
+)
+LAST_NAMES = (
+    "Lovelace", "Turing", "Liskov", "Ritchie", "Knuth", "Dijkstra", "Allen",
+    "Hopper", "McCarthy", "Thompson", "Lamport", "Torvalds", "Hamilton",
+    "Wirth", "Perlman", "Berners-Lee",
+)
+PERMISSIONS = (UserPermission.guest, UserPermission.staff, UserPermission.admin)
+PERMISSION_WEIGHTS = (0.95, 0.045, 0.005)
+
+START_DATE = datetime(2020, 1, 1)
+DATE_RANGE = timedelta(days=5 * 365)
+CORPUS_SIZE = 1 << 20
+MAX_BODY_LENGTH = 200_000
+BCRYPT_ALPHABET = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+
+
+def make_id(created: datetime, number: int, kind: int) -> ObjectId:
+    # Timestamp first like a driver generated id, then a unique counter
+    return ObjectId(
+        int(created.replace(tzinfo=timezone.utc).timestamp()).to_bytes(4, "big") +
+        kind.to_bytes(1, "big") +
+        number.to_bytes(7, "big")
+    )
+
+
+def seeded_salt(seed: int, rounds: int) -> bytes:
+    # 22 characters encode the 16 salt bytes, the last one only carries two
+    # bits, so it must be one of the characters whose low four bits are zero
+    rng = random.Random(seed)
+    salt = "".join(rng.choice(BCRYPT_ALPHABET) for _ in range(21))
+    salt += rng.choice(BCRYPT_ALPHABET[::16])
+    return f"$2b${rounds:02d}${salt}".encode()
+
+
+def clamp(value: float, low: int, high: int) -> int:
+    return max(low, min(high, int(value)))
+
+
+class Generator:
+    def __init__(self, seed: int, users: int, passwd_hash: str) -> None:
+        self.rng = random.Random(seed)
+        self.users = users
+        self.passwd_hash = passwd_hash
+        self.corpus = " ".join(
+            self.rng.choice(WORDS) for _ in range(CORPUS_SIZE // 4)
+        )[:CORPUS_SIZE]
+        # Zipf-like popularity, a few authors write most of the articles
+        self.author_weights = list(itertools.accumulate(
+            1 / (rank + 1) for rank in range(users)
+        ))
+
+    def text(self, length: int) -> str:
+        start = self.rng.randrange(len(self.corpus) - length)
+        return self.corpus[start:start + length].strip() or "text"
+
+    def date(self) -> datetime:
+        return START_DATE + self.rng.random() * DATE_RANGE
+
+    def username(self, number: int) -> str:
+        return f"user{number:07d}"
+
+    def user(self, number: int) -> dict:
+        rng = self.rng
+        created = self.date()
+        return {
+            "_id": make_id(created, number, 0),
+            "username": self.username(number),
+            "f_name": rng.choice(FIRST_NAMES) if rng.random() < 0.7 else None,
+            "l_name": rng.choice(LAST_NAMES) if rng.random() < 0.6 else None,
+            "passwd_hash": self.passwd_hash,
+            "permission": rng.choices(PERMISSIONS, PERMISSION_WEIGHTS)[0].value,
+        }
+
+    def article(self, number: int) -> dict:
+        rng = self.rng
+        pub_date = self.date()
+        mod_date = (
+            pub_date + timedelta(days=rng.expovariate(1 / 30))
+            if rng.random() < 0.3
+            else pub_date
+        )
+        author = rng.choices(
+            range(self.users),
+            cum_weights=self.author_weights,
+        )[0]
+        suffix = f" #{number}"
+        title_length = clamp(rng.lognormvariate(3.4, 0.4), 8, 64 - len(suffix))
+
+        return {
+            "_id": make_id(pub_date, number, 1),
+            "title": self.text(title_length) + suffix,
+            "author": self.username(author),
+            "pub_date": pub_date.isoformat(),
+            "mod_date": mod_date.isoformat(),
+            # Median around 3k characters with a long tail
+            "body": self.text(
+                clamp(rng.lognormvariate(8, 1), 200, MAX_BODY_LENGTH)
+            ),
+            "summary": (
+                self.text(clamp(rng.gauss(200, 60), 40, 400))
+                if rng.random() < 0.7
+                else None
+            ),
+        }
+
+
+async def insert(
+    repo: repository.Repository,
+    documents,
+    batch_size: int,
+    concurrency: int,
+) -> tuple[int, int]:
+    slots = asyncio.Semaphore(concurrency)
+    tasks = set()
+    counts = [0, 0]
+
+    async def write(batch: list[dict]) -> None:
+        try:
+            inserted, skipped = await repo.insert_many(batch)
+            counts[0] += inserted
+            counts[1] += skipped
+        finally:
+            slots.release()
+
+    documents = iter(documents)
+    while batch := list(itertools.islice(documents, batch_size)):
+        # Waiting for a slot before generating the next batch bounds memory
+        await slots.acquire()
+        task = asyncio.create_task(write(batch))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    await asyncio.gather(*tasks)
+    return (counts[0], counts[1])
+
+
+async def seed(
+    users: int,
+    articles: int,
+    seed: int = 42,
+    password: str = "password123",
+    batch_size: int = 1000,
+    concurrency: int = 4,
+) -> dict:
+    await run_db_setup()
+
+    # One bcrypt hash shared by every user, hashing per user would dominate.
+    # Its salt comes from the seed too, so reruns produce the same hash.
+    passwd_hash = (await asyncio.to_thread(
+        bcrypt.hashpw,
+        password.encode(),
+        seeded_salt(seed, settings.BCRYPT_ROUNDS),
+    )).decode()
+    generator = Generator(seed, max(users, 1), passwd_hash)
+
+    result = {}
+    for name, repo, count, make in (
+        ("users", repository.users, users, generator.user),
+        ("articles", repository.articles, articles, generator.article),
+    ):
+        started = time.perf_counter()
+        inserted, skipped = await insert(
+            repo,
+            (make(number) for number in range(count)),
+            batch_size,
+            concurrency,
+        )
+        result[name] = {
+            "inserted": inserted,
+            "skipped": skipped,
+            "seconds": time.perf_counter() - started,
+        }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    result = asyncio.run(seed(
+        users=args.users,
+        articles=args.articles,
+        seed=args.seed,
+        password=args.password,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+    ))
+    for name, counts in result.items():
+        print(
+            f"{name:<10}{counts['inserted']:>10} inserted"
+            f"{counts['skipped']:>10} skipped{counts['seconds']:>10.1f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import secrets
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import MongoDsn, Field
@@ -12,13 +13,85 @@ class Settings(BaseSettings):
 
     DEBUG: bool = True
     ORIGINS: list = ["http://127.0.0.1:8000/",]
-    mongo_dsn: MongoDsn = 'xxx'
+    mongo_dsn: MongoDsn = 'mongodb://localhost:27017'
+    # "memory" keeps every collection in process, for tests and benchmarks
+    STORAGE_BACKEND: Literal["mongo", "memory"] = "mongo"
 
     SECRET_KEY: str = Field(secrets.token_urlsafe(64))
     TOKEN_ALGORITHM: str = "HS256"
 
     # Time by minutes
-    TOKEN_EXPIRED_TIME: int = 20
+    TOKEN_EXPIRED_TIME: int = 5
+    # Time by days
+    REFRESH_TOKEN_EXPIRED_TIME: int = 14
+
+    # bcrypt work factor, see `python -m app.commands.calibrate_bcrypt`
+    BCRYPT_ROUNDS: int = Field(default=12, ge=4, le=31)
+
+    # Time by milliseconds, deadlines for a single Mongo operation
+    MONGO_READ_TIMEOUT: int = 2000
+    MONGO_WRITE_TIMEOUT: int = 5000
+
+    # Circuit breaker over the last BREAKER_WINDOW Mongo operations
+    BREAKER_WINDOW: int = 20
+    BREAKER_MIN_CALLS: int = 10
+    BREAKER_ERROR_RATE: float = 0.5
+    # Time by milliseconds
+    BREAKER_SLOW_CALL_TIME: int = 1000
+    BREAKER_SLOW_CALL_RATE: float = 0.5
+    # Time by seconds
+    BREAKER_RESET_TIME: int = 30
+
+    # Profiles /graphql requests that carry a signed X-Profile header,
+    # needs the "profiling" extra (pyinstrument)
+    PROFILING_ENABLED: bool = False
+    PROFILING_DIR: str = "profiles"
+    # Time by seconds
+    PROFILING_INTERVAL: float = 0.001
+    PROFILING_SIGNATURE_TTL: int = 300
+
+    # Cache-Control of GraphQL queries by top level field, queries that
+    # select any other field are not cached
+    CACHE_CONTROL: dict[str, str] = {
+        "article": "public, max-age=60",
+        "articles": "public, max-age=10",
+        "articlesList": "public, max-age=10",
+    }
+
+    # Time by seconds, how stale a cached count of a filtered list may be
+    COUNT_CACHE_TTL: float = 30
+    COUNT_CACHE_SIZE: int = 1024
+
+    # Article bodies longer than this many characters are compressed into
+    # chunks of the article_bodies collection instead of stored inline
+    BODY_EXTERNAL_THRESHOLD: int = 16 * 1024
+    BODY_CHUNK_SIZE: int = 256 * 1024
+    BODY_COMPRESSION_LEVEL: int = Field(default=6, ge=0, le=9)
+
+    # Mutation audit events are buffered and written in batches, when the
+    # buffer is full "block" makes the mutation wait and "drop" discards
+    AUDIT_QUEUE_SIZE: int = 10_000
+    AUDIT_BATCH_SIZE: int = 500
+    # Time by seconds
+    AUDIT_FLUSH_INTERVAL: float = 1.0
+    AUDIT_OVERFLOW: Literal["block", "drop"] = "block"
+
+    # Time by milliseconds, what the app's own modules may take under
+    # `python -X importtime -c "import app.main"` (third-party packages left
+    # out) before app/tests/test_startup.py fails
+    IMPORT_TIME_BUDGET: int = 300
+
+    # Documents per cursor batch / insert_many call of the NDJSON transfer
+    EXPORT_BATCH_SIZE: int = 1000
+    IMPORT_BATCH_SIZE: int = 1000
+
+    # Time by milliseconds, None disables the slow operation log
+    SLOW_OPERATION_THRESHOLD: float | None = None
+    SLOW_OPERATION_LOG_FILE: str = "slow_operations.log"
+    SLOW_OPERATION_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    SLOW_OPERATION_LOG_BACKUP_COUNT: int = 5
+    # Share of slow operations whose Mongo commands get explained
+    SLOW_OPERATION_EXPLAIN_RATE: float = 0.1
 
 
 settings = Settings()
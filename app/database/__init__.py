@@ -1,3 +1,5 @@
 from . import db
+from . import memory
 from . import models
+from . import repository
 from . import utils
\ No newline at end of file
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+
+from app.config import settings
+from app.database import repository
+from app.database.models import AuditEvent
+from app.database.repository import dump_document
+
+logger = logging.getLogger("app.audit")
+
+# Put by `stop`, the flusher writes what it holds and exits
+_STOP = object()
+
+
+class AuditLog:
+    def __init__(
+        self,
+        queue_size: int,
+        batch_size: int,
+        flush_interval: float,
+        overflow: str,
+    ) -> None:
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+
+        self.queue: asyncio.Queue | None = None
+        self.flusher: asyncio.Task | None = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.flusher = asyncio.create_task(self.flush())
+
+    async def stop(self) -> None:
+        if self.flusher is None:
+            return
+
+        await self.queue.put(_STOP)
+        await self.flusher
+        self.queue = self.flusher = None
+
+    async def record(
+        self,
+        action: str,
+        actor: str | None = None,
+        target: str | None = None,
+        changes: dict | None = None,
+    ) -> None:
+        event = AuditEvent(action=action, actor=actor, target=target, changes=changes)
+
+        if self.queue is None:
+            # Nothing flushes outside the app (scripts, tests), write it now
+            await self.write([event])
+        elif self.overflow == "drop":
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped += 1
+        else:
+            await self.queue.put(event)
+
+    async def write(self, events: list[AuditEvent]) -> None:
+        try:
+            inserted, _ = await repository.audit_events.insert_many(
+                [dump_document(event) for event in events]
+            )
+            self.written += inserted
+        except Exception:
+            # Losing audit events must not fail the mutations behind them
+            self.failed += len(events)
+            logger.exception("Failed to write %d audit events", len(events))
+
+    async def flush(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            event = await self.queue.get()
+            if event is _STOP:
+                return
+
+            batch = [event]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    event = await asyncio.wait_for(
+                        self.queue.get(), deadline - loop.time()
+                    )
+                except TimeoutError:
+                    break
+                if event is _STOP:
+                    stopping = True
+                    break
+                batch.append(event)
+
+            await self.write(batch)
+
+    def snapshot(self) -> dict:
+        return {
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+audit_log = AuditLog(
+    queue_size=settings.AUDIT_QUEUE_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL,
+    overflow=settings.AUDIT_OVERFLOW,
+)
@@ -0,0 +1,137 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from enum import Enum
+
+import pymongo
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+from app.config import settings
+
+
+class DatabaseUnavailable(Exception):
+    pass
+
+
+class BreakerState(Enum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        window: int,
+        min_calls: int,
+        error_rate: float,
+        slow_call_time: float,
+        slow_call_rate: float,
+        reset_time: float,
+    ) -> None:
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_time = slow_call_time
+        self.slow_call_rate = slow_call_rate
+        self.reset_time = reset_time
+
+        self.state = BreakerState.closed
+        self.opened_at = 0.0
+        self.probing = False
+        self.calls: deque[tuple[bool, bool]] = deque(maxlen=window)
+
+    def allow(self) -> bool:
+        if self.state is BreakerState.open:
+            if time.monotonic() - self.opened_at < self.reset_time:
+                return False
+            self.state = BreakerState.half_open
+
+        if self.state is BreakerState.half_open:
+            # Let a single call probe the database before closing again
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def record(self, duration: float, failed: bool) -> None:
+        slow = duration >= self.slow_call_time
+
+        if self.state is BreakerState.half_open:
+            self.probing = False
+            if failed or slow:
+                self.trip()
+            else:
+                self.reset()
+            return
+
+        self.calls.append((failed, slow))
+        if len(self.calls) < self.min_calls:
+            return
+
+        errors = sum(failed for failed, _ in self.calls)
+        slows = sum(slow for _, slow in self.calls)
+        if (
+            errors / len(self.calls) >= self.error_rate or
+            slows / len(self.calls) >= self.slow_call_rate
+        ):
+            self.trip()
+
+    def trip(self) -> None:
+        self.state = BreakerState.open
+        self.opened_at = time.monotonic()
+        self.calls.clear()
+
+    def reset(self) -> None:
+        self.state = BreakerState.closed
+        self.calls.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state.value,
+            "calls": len(self.calls),
+            "errors": sum(failed for failed, _ in self.calls),
+            "slow_calls": sum(slow for _, slow in self.calls),
+        }
+
+
+breaker = CircuitBreaker(
+    window=settings.BREAKER_WINDOW,
+    min_calls=settings.BREAKER_MIN_CALLS,
+    error_rate=settings.BREAKER_ERROR_RATE,
+    slow_call_time=settings.BREAKER_SLOW_CALL_TIME,
+    slow_call_rate=settings.BREAKER_SLOW_CALL_RATE,
+    reset_time=settings.BREAKER_RESET_TIME,
+)
+
+
+def is_unavailable(error: PyMongoError) -> bool:
+    return isinstance(error, ConnectionFailure) or error.timeout
+
+
+@contextmanager
+def guarded(timeout: int):
+    if not breaker.allow():
+        raise DatabaseUnavailable("circuit breaker is open")
+
+    started = time.perf_counter()
+    try:
+        with pymongo.timeout(timeout / 1000):
+            yield
+    except PyMongoError as e:
+        failed = is_unavailable(e)
+        breaker.record((time.perf_counter() - started) * 1000, failed)
+        if failed:
+            raise DatabaseUnavailable(str(e)) from e
+        raise
+    except BaseException:
+        breaker.probing = False
+        raise
+    breaker.record((time.perf_counter() - started) * 1000, False)
+
+
+def reading():
+    return guarded(settings.MONGO_READ_TIMEOUT)
+
+
+def writing():
+    return guarded(settings.MONGO_WRITE_TIMEOUT)
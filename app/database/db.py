@@ -1,16 +1,32 @@
 from copy import deepcopy
+from functools import cache
 
 from pymongo import AsyncMongoClient
 from pydantic import BaseModel
 
 from app.config import settings
 from app.database import models
+from app.database.memory import MemoryClient
+from app.database.monitoring import CommandTracker
+
+
+def create_client():
+    if settings.STORAGE_BACKEND == "memory":
+        return MemoryClient()
+
+    return AsyncMongoClient(
+        str(settings.mongo_dsn),
+        maxPoolSize=10,
+        minPoolSize=2,
+        event_listeners=(
+            [CommandTracker()]
+            if settings.SLOW_OPERATION_THRESHOLD is not None
+            else []
+        ),
+    )
+
 
-client = AsyncMongoClient(
-    str(settings.mongo_dsn),
-    maxPoolSize=10,
-    minPoolSize=2,
-)
+client = create_client()
 
 _db_name = "test_database" if settings.DEBUG else "main_line"
 db = client.get_database(_db_name)
@@ -19,6 +35,9 @@ db = client.get_database(_db_name)
 base_models = {
     "users": models.User,
     "articles": models.Article,
+    "article_bodies": models.ArticleBodyChunk,
+    "refresh_tokens": models.RefreshToken,
+    "audit_events": models.AuditEvent,
 }
 
 base_schema = {
@@ -39,9 +58,15 @@ async def remove_not_compatible_fields(schema: dict) -> dict:
     return schema
 
 
+# Pydantic builds the JSON schema again on every call
+@cache
+def model_json_schema(model: type[BaseModel]) -> dict:
+    return model.model_json_schema()
+
+
 async def create_schema(name: str, model: BaseModel) -> tuple[dict, dict]:
     model_shcema = await remove_not_compatible_fields(
-        model.model_json_schema()
+        deepcopy(model_json_schema(model))
     )
 
     schema = deepcopy(base_schema)
@@ -53,6 +78,14 @@ async def create_schema(name: str, model: BaseModel) -> tuple[dict, dict]:
     return (schema, model_shcema,)
 
 
+async def drop_retired_indexes(collection, names: list[str]) -> None:
+    # Only indexes the app itself declared once, never ones added by hand
+    existing = await collection.index_information()
+    for name in names:
+        if name in existing:
+            await collection.drop_index(name)
+
+
 async def run_db_setup() -> None:
     existing_collections = await db.list_collection_names()
 
@@ -64,9 +97,12 @@ async def run_db_setup() -> None:
                 await db.create_collection(name=name)
 
             await db.command(schema)
-            if "indexes" in model_schema:
-                await db.get_collection(name).create_indexes(
-                    model_schema["indexes"]
+            collection = db.get_collection(name)
+            if "retired_indexes" in model_schema:
+                await drop_retired_indexes(
+                    collection, model_schema["retired_indexes"]
                 )
+            if "indexes" in model_schema:
+                await collection.create_indexes(model_schema["indexes"])
         except Exception:
             raise
\ No newline at end of file
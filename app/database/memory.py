@@ -0,0 +1,571 @@
+from copy import deepcopy
+
+from bson import ObjectId
+from pymongo import IndexModel, ReturnDocument
+from pymongo.errors import (
+    BulkWriteError,
+    CollectionInvalid,
+    DuplicateKeyError,
+    OperationFailure,
+)
+from pymongo.results import (
+    DeleteResult,
+    InsertManyResult,
+    InsertOneResult,
+    UpdateResult,
+)
+
+
+MISSING = object()
+
+
+def get_field(document: dict, path: str):
+    value = document
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return MISSING
+        value = value[key]
+    return value
+
+
+def set_field(document: dict, path: str, value) -> None:
+    *parents, key = path.split(".")
+    for parent in parents:
+        document = document.setdefault(parent, {})
+    document[key] = value
+
+
+def unset_field(document: dict, path: str) -> None:
+    *parents, key = path.split(".")
+    for parent in parents:
+        document = document.get(parent)
+        if not isinstance(document, dict):
+            return
+    document.pop(key, None)
+
+
+def compare(value, operator: str, expected) -> bool:
+    try:
+        match operator:
+            case "$eq":
+                return value == expected
+            case "$ne":
+                return value != expected
+            case "$gt":
+                return value is not None and value > expected
+            case "$gte":
+                return value is not None and value >= expected
+            case "$lt":
+                return value is not None and value < expected
+            case "$lte":
+                return value is not None and value <= expected
+            case "$in":
+                return value in expected
+            case "$nin":
+                return value not in expected
+    except TypeError:
+        return False
+    raise OperationFailure(f"unknown operator: {operator}")
+
+
+def matches(document: dict, filter: dict) -> bool:
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches(document, item) for item in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches(document, item) for item in condition):
+                return False
+            continue
+
+        value = get_field(document, key)
+        if isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+            for operator, expected in condition.items():
+                if operator == "$exists":
+                    if (value is not MISSING) != bool(expected):
+                        return False
+                elif not compare(None if value is MISSING else value, operator, expected):
+                    return False
+        elif (None if value is MISSING else value) != condition:
+            return False
+    return True
+
+
+def project(document: dict, projection: dict | None) -> dict:
+    document = deepcopy(document)
+    if not projection:
+        return document
+
+    include_id = projection.get("_id", 1)
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+
+    if any(fields.values()):
+        result = {key: document[key] for key in fields if key in document}
+        if include_id and "_id" in document:
+            result = {"_id": document["_id"], **result}
+        return result
+
+    for key in fields:
+        unset_field(document, key)
+    if not include_id:
+        document.pop("_id", None)
+    return document
+
+
+def sort_key(value):
+    # None and missing fields sort first, like in MongoDB
+    return (value is not MISSING and value is not None, value)
+
+
+def sort_documents(documents: list[dict], sort: list[tuple[str, int]]) -> list[dict]:
+    for key, direction in reversed(sort):
+        documents.sort(
+            key=lambda document: sort_key(get_field(document, key)),
+            reverse=direction < 0,
+        )
+    return documents
+
+
+def normalize_sort(key_or_list, direction=None) -> list[tuple[str, int]]:
+    if key_or_list is None:
+        return []
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return list(key_or_list)
+
+
+class MemoryIndex:
+    def __init__(self, model: IndexModel) -> None:
+        document = model.document
+        self.name: str = document["name"]
+        self.key: list[tuple[str, int]] = list(document["key"].items())
+        self.keys: tuple[str, ...] = tuple(document["key"])
+        self.unique: bool = document.get("unique", False)
+        self.entries: dict[tuple, set] = {}
+
+    def key_of(self, document: dict) -> tuple:
+        return tuple(
+            None if (value := get_field(document, key)) is MISSING else value
+            for key in self.keys
+        )
+
+    def check(self, document: dict, collection: str) -> None:
+        if not self.unique:
+            return
+        owners = self.entries.get(self.key_of(document), set())
+        if owners - {document["_id"]}:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {collection} "
+                f"index: {self.name}",
+                code=11000,
+            )
+
+    def add(self, document: dict) -> None:
+        self.entries.setdefault(self.key_of(document), set()).add(document["_id"])
+
+    def remove(self, document: dict) -> None:
+        key = self.key_of(document)
+        owners = self.entries.get(key)
+        if owners is not None:
+            owners.discard(document["_id"])
+            if not owners:
+                del self.entries[key]
+
+    def lookup(self, filter: dict) -> set | None:
+        values = []
+        for key in self.keys:
+            value = filter.get(key, MISSING)
+            if value is MISSING or (
+                isinstance(value, dict) and any(k.startswith("$") for k in value)
+            ):
+                return None
+            values.append(value)
+        return self.entries.get(tuple(values), set())
+
+
+class MemoryCursor:
+    def __init__(self, collection: "MemoryCollection", filter: dict, projection) -> None:
+        self._collection = collection
+        self._filter = filter
+        self._projection = projection
+        self._sort: list[tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: list[dict] | None = None
+        self._position = 0
+
+    def sort(self, key_or_list, direction=None) -> "MemoryCursor":
+        self._sort = normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> "MemoryCursor":
+        return self
+
+    async def explain(self) -> dict:
+        return {
+            "queryPlanner": {
+                "namespace": self._collection.full_name,
+                "winningPlan": self._collection._plan(self._filter, self._sort),
+            }
+        }
+
+    def _evaluate(self) -> list[dict]:
+        if self._results is None:
+            documents = sort_documents(
+                self._collection._find(self._filter),
+                self._sort,
+            )[self._skip:]
+            if self._limit:
+                documents = documents[:self._limit]
+            self._results = [
+                project(document, self._projection) for document in documents
+            ]
+        return self._results
+
+    async def to_list(self, length: int | None = None) -> list[dict]:
+        results = self._evaluate()
+        end = len(results) if length is None else self._position + length
+        items = results[self._position:end]
+        self._position += len(items)
+        return items
+
+    async def next(self) -> dict:
+        results = self._evaluate()
+        if self._position >= len(results):
+            raise StopAsyncIteration
+        self._position += 1
+        return results[self._position - 1]
+
+    def __aiter__(self) -> "MemoryCursor":
+        return self
+
+    async def __anext__(self) -> dict:
+        return await self.next()
+
+    async def close(self) -> None:
+        self._results = []
+        self._position = 0
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str) -> None:
+        self.database = database
+        self.name = name
+        self.full_name = f"{database.name}.{name}"
+        self._documents: dict = {}
+        self._indexes: dict[str, MemoryIndex] = {}
+
+    def _candidates(self, filter: dict) -> list[dict]:
+        if "_id" in filter and not isinstance(filter["_id"], dict):
+            document = self._documents.get(filter["_id"])
+            return [document] if document is not None else []
+
+        for index in self._indexes.values():
+            ids = index.lookup(filter)
+            if ids is not None:
+                return [self._documents[id] for id in ids]
+        return list(self._documents.values())
+
+    def _plan(self, filter: dict, sort: list[tuple[str, int]]) -> dict:
+        # Mirrors how MongoDB picks an index: equality fields have to form a
+        # prefix of the key, which may continue with the sort or range field.
+        fields = [key for key in filter if not key.startswith("$")]
+        equality = {
+            key for key in fields
+            if not (
+                isinstance(filter[key], dict) and
+                any(k.startswith("$") for k in filter[key])
+            )
+        }
+        followers = {key for key in fields if key not in equality}
+        if sort:
+            followers.add(sort[0][0])
+
+        indexes = [("_id_", ("_id",))] + [
+            (name, index.keys) for name, index in self._indexes.items()
+        ]
+        for name, keys in indexes:
+            prefix = 0
+            while prefix < len(keys) and keys[prefix] in equality:
+                prefix += 1
+            if prefix == len(equality) and (
+                prefix > 0 or (prefix < len(keys) and keys[prefix] in followers)
+            ):
+                return {
+                    "stage": "FETCH",
+                    "inputStage": {"stage": "IXSCAN", "indexName": name},
+                }
+
+        if sort:
+            return {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}
+        return {"stage": "COLLSCAN"}
+
+    def _find(self, filter: dict | None) -> list[dict]:
+        filter = filter or {}
+        return [
+            document
+            for document in self._candidates(filter)
+            if matches(document, filter)
+        ]
+
+    def _check_unique(self, document: dict) -> None:
+        for index in self._indexes.values():
+            index.check(document, self.full_name)
+
+    def _store(self, document: dict) -> None:
+        self._documents[document["_id"]] = document
+        for index in self._indexes.values():
+            index.add(document)
+
+    def _discard(self, document: dict) -> None:
+        del self._documents[document["_id"]]
+        for index in self._indexes.values():
+            index.remove(document)
+
+    def _insert(self, document: dict) -> ObjectId:
+        # Like pymongo, the _id is set on the caller's document even when the
+        # insert then fails
+        document.setdefault("_id", ObjectId())
+        stored = deepcopy(document)
+        if stored["_id"] in self._documents:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.full_name} "
+                "index: _id_",
+                code=11000,
+            )
+        self._check_unique(stored)
+        self._store(stored)
+        return stored["_id"]
+
+    def _apply(self, document: dict, update: dict) -> dict:
+        updated = deepcopy(document)
+        for operator, fields in update.items():
+            for key, value in fields.items():
+                match operator:
+                    case "$set":
+                        set_field(updated, key, deepcopy(value))
+                    case "$unset":
+                        unset_field(updated, key)
+                    case "$inc":
+                        current = get_field(updated, key)
+                        set_field(
+                            updated,
+                            key,
+                            value if current is MISSING else current + value,
+                        )
+                    case _:
+                        raise OperationFailure(f"unknown update operator: {operator}")
+
+        if updated["_id"] != document["_id"]:
+            raise OperationFailure("the _id field cannot be changed")
+        return updated
+
+    def _replace(self, document: dict, updated: dict) -> bool:
+        if updated == document:
+            return False
+        self._discard(document)
+        try:
+            self._check_unique(updated)
+        except DuplicateKeyError:
+            self._store(document)
+            raise
+        self._store(updated)
+        return True
+
+    async def create_indexes(self, indexes: list[IndexModel]) -> list[str]:
+        names = []
+        for model in indexes:
+            index = MemoryIndex(model)
+            for document in self._documents.values():
+                index.check(document, self.full_name)
+                index.add(document)
+            self._indexes[index.name] = index
+            names.append(index.name)
+        return names
+
+    async def create_index(self, keys, **kwargs) -> str:
+        return (await self.create_indexes([IndexModel(keys, **kwargs)]))[0]
+
+    async def drop_index(self, name: str) -> None:
+        if self._indexes.pop(name, None) is None:
+            raise OperationFailure(f"index not found with name [{name}]")
+
+    async def index_information(self) -> dict:
+        information = {"_id_": {"key": [("_id", 1)]}}
+        for name, index in self._indexes.items():
+            information[name] = {"key": index.key, "unique": index.unique}
+        return information
+
+    async def insert_one(self, document: dict) -> InsertOneResult:
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents, ordered: bool = True) -> InsertManyResult:
+        inserted, errors = [], []
+        for index, document in enumerate(documents):
+            try:
+                inserted.append(self._insert(document))
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": e.code, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({
+                "writeErrors": errors,
+                "writeConcernErrors": [],
+                "nInserted": len(inserted),
+                "nUpserted": 0,
+                "nMatched": 0,
+                "nModified": 0,
+                "nRemoved": 0,
+                "upserted": [],
+            })
+        return InsertManyResult(inserted, True)
+
+    def find(self, filter: dict | None = None, projection: dict | None = None, **kwargs):
+        cursor = MemoryCursor(self, filter or {}, projection)
+        if "sort" in kwargs:
+            cursor.sort(kwargs["sort"])
+        return cursor.skip(kwargs.get("skip", 0)).limit(kwargs.get("limit", 0))
+
+    async def find_one(self, filter: dict | None = None, projection: dict | None = None, **kwargs):
+        results = await self.find(filter, projection, **kwargs).limit(1).to_list()
+        return results[0] if results else None
+
+    async def count_documents(self, filter: dict, **kwargs) -> int:
+        count = max(len(self._find(filter)) - kwargs.get("skip", 0), 0)
+        if kwargs.get("limit"):
+            count = min(count, kwargs["limit"])
+        return count
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        return len(self._documents)
+
+    async def find_one_and_update(
+        self,
+        filter: dict,
+        update: dict,
+        projection: dict | None = None,
+        sort=None,
+        return_document: bool = ReturnDocument.BEFORE,
+        **kwargs,
+    ) -> dict | None:
+        documents = sort_documents(self._find(filter), normalize_sort(sort))
+        if not documents:
+            return None
+
+        document = documents[0]
+        updated = self._apply(document, update)
+        self._replace(document, updated)
+        return project(updated if return_document else document, projection)
+
+    async def find_one_and_delete(self, filter: dict, projection: dict | None = None, **kwargs):
+        documents = self._find(filter)
+        if not documents:
+            return None
+        self._discard(documents[0])
+        return project(documents[0], projection)
+
+    async def update_one(self, filter: dict, update: dict, **kwargs) -> UpdateResult:
+        documents = self._find(filter)[:1]
+        modified = sum(
+            self._replace(document, self._apply(document, update))
+            for document in documents
+        )
+        return UpdateResult({"n": len(documents), "nModified": modified}, True)
+
+    async def update_many(self, filter: dict, update: dict, **kwargs) -> UpdateResult:
+        documents = self._find(filter)
+        modified = sum(
+            self._replace(document, self._apply(document, update))
+            for document in documents
+        )
+        return UpdateResult({"n": len(documents), "nModified": modified}, True)
+
+    async def delete_one(self, filter: dict, **kwargs) -> DeleteResult:
+        documents = self._find(filter)[:1]
+        for document in documents:
+            self._discard(document)
+        return DeleteResult({"n": len(documents)}, True)
+
+    async def delete_many(self, filter: dict, **kwargs) -> DeleteResult:
+        documents = self._find(filter)
+        for document in documents:
+            self._discard(document)
+        return DeleteResult({"n": len(documents)}, True)
+
+    async def drop(self) -> None:
+        self.database._collections.pop(self.name, None)
+
+
+class MemoryDatabase:
+    def __init__(self, client: "MemoryClient", name: str) -> None:
+        self.client = client
+        self.name = name
+        self._collections: dict[str, MemoryCollection] = {}
+
+    def get_collection(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(self, name)
+        return self._collections[name]
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        return self.get_collection(name)
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.get_collection(name)
+
+    async def list_collection_names(self) -> list[str]:
+        return list(self._collections)
+
+    async def create_collection(self, name: str, **kwargs) -> MemoryCollection:
+        if name in self._collections:
+            raise CollectionInvalid(f"collection {name} already exists")
+        return self.get_collection(name)
+
+    async def drop_collection(self, name: str) -> None:
+        self._collections.pop(name, None)
+
+    async def command(self, command: dict, **kwargs) -> dict:
+        # Validators and server commands have no in-memory counterpart
+        if "collMod" in command or "ping" in command:
+            return {"ok": 1.0}
+        raise OperationFailure(
+            f"command {next(iter(command))} is not supported in memory"
+        )
+
+
+class MemoryClient:
+    def __init__(self) -> None:
+        self._databases: dict[str, MemoryDatabase] = {}
+
+    def get_database(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(self, name)
+        return self._databases[name]
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        return self.get_database(name)
+
+    async def list_database_names(self) -> list[str]:
+        return list(self._databases)
+
+    async def drop_database(self, name: str) -> None:
+        database = self._databases.get(name)
+        if database is not None:
+            database._collections.clear()
+
+    async def close(self) -> None:
+        pass
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Annotated
+from typing import Annotated, Any
 from datetime import datetime
 
 from pydantic import BaseModel, Field, ConfigDict, WithJsonSchema
@@ -95,6 +95,54 @@ class User(
             }
         )
     ] = Field(default=UserPermission.guest)
+    # Refresh tokens issued before this are rejected, set when the user is
+    # created and when an admin revokes sessions in bulk
+    tokens_not_before: Annotated[
+        datetime | None,
+        WithJsonSchema(
+            {
+                "title": "tokens_not_before",
+                "bsonType": ["string", "null"],
+            }
+        )
+    ] = Field(default=None)
+
+
+class RefreshToken(
+    BaseModel,
+    BaseUsername,
+):
+    model_config = ConfigDict(
+        extra='forbid',
+        json_schema_extra={
+            "indexes": [
+                IndexModel([("token_hash", 1)], unique=True),
+                IndexModel([("username", 1)]),
+                IndexModel([("expires_at", 1)], expireAfterSeconds=0),
+            ]
+        }
+    )
+
+    token_hash: str = Field(min_length=64, max_length=64)
+    # Stored as a BSON date, the TTL index ignores strings
+    expires_at: Annotated[
+        datetime,
+        WithJsonSchema(
+            {
+                "title": "expires_at",
+                "bsonType": "date",
+            }
+        )
+    ]
+    issued_at: Annotated[
+        datetime | None,
+        WithJsonSchema(
+            {
+                "title": "issued_at",
+                "bsonType": ["string", "null"],
+            }
+        )
+    ] = Field(default=None)
 
 
 class BaseTitle:
@@ -137,13 +185,74 @@ class Article(
         json_schema_extra = {
             "indexes": [
                 IndexModel([("title", 1)], unique=True),
-                IndexModel([("pub_date", 1), ("mod_date", 1), ("author", 1)]),
+                # Equality on author first, then pub_date serves both the
+                # date range and the sort, in either direction.
+                IndexModel([("author", 1), ("pub_date", -1)]),
+                IndexModel([("pub_date", -1)]),
             ],
+            # Declared before, dropped by run_db_setup when still present
+            "retired_indexes": ["pub_date_1_mod_date_1_author_1"],
         },
     )
 
     body: str | None = Field(default=None)
     summary: str | None = Field(default=None)
+    # Set instead of body when it is stored in article_bodies
+    body_id: str | None = Field(default=None, min_length=24, max_length=24)
+    body_size: Annotated[
+        int | None,
+        WithJsonSchema(
+            {
+                "title": "body_size",
+                "bsonType": ["int", "long", "null"],
+                "minimum": 0,
+            }
+        )
+    ] = Field(default=None, ge=0)
+
+
+class ArticleBodyChunk(BaseModel):
+    model_config = ConfigDict(
+        extra="forbid",
+        json_schema_extra={
+            "indexes": [
+                IndexModel([("body_id", 1), ("offset", 1)], unique=True),
+            ],
+        },
+    )
+
+    body_id: str = Field(min_length=24, max_length=24)
+    # Character range of the body this chunk holds
+    offset: Annotated[
+        int,
+        WithJsonSchema(
+            {
+                "title": "offset",
+                "bsonType": ["int", "long"],
+                "minimum": 0,
+            }
+        )
+    ] = Field(ge=0)
+    end: Annotated[
+        int,
+        WithJsonSchema(
+            {
+                "title": "end",
+                "bsonType": ["int", "long"],
+                "minimum": 0,
+            }
+        )
+    ] = Field(ge=0)
+    # zlib compressed UTF-8
+    data: Annotated[
+        bytes,
+        WithJsonSchema(
+            {
+                "title": "data",
+                "bsonType": "binData",
+            }
+        )
+    ]
 
 
 class ArticleInfo(
@@ -157,4 +266,30 @@ class ArticleInfo(
 
 
 class ArticleList(BaseModel):
-    root: list[ArticleInfo]
\ No newline at end of file
+    root: list[ArticleInfo]
+
+class AuditEvent(BaseModel):
+    model_config = ConfigDict(
+        extra="forbid",
+        json_schema_extra={
+            "indexes": [
+                IndexModel([("time", -1)]),
+                IndexModel([("target", 1), ("time", -1)]),
+            ],
+        },
+    )
+
+    action: str = Field(max_length=32)
+    # Username of the caller, if it was authenticated
+    actor: str | None = Field(default=None, max_length=32)
+    target: str | None = Field(default=None, max_length=64)
+    changes: dict[str, Any] | None = Field(default=None)
+    time: Annotated[
+        datetime,
+        WithJsonSchema(
+            {
+                "title": "time",
+                "type": "string",
+            }
+        )
+    ] = Field(default_factory=datetime.now)
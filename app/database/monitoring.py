@@ -0,0 +1,83 @@
+import time
+from contextvars import ContextVar
+
+from pymongo import monitoring
+
+# Fields added by the driver that are not part of the command itself
+DRIVER_COMMAND_FIELDS = {
+    "lsid",
+    "$db",
+    "$clusterTime",
+    "$readPreference",
+    "txnNumber",
+    "autocommit",
+    "startTransaction",
+    "signature",
+}
+
+
+def shape_of(value):
+    if isinstance(value, dict):
+        return {key: shape_of(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [shape_of(value[0])] if value else []
+    if value is None:
+        return None
+    return type(value).__name__
+
+
+class TrackedCommands:
+    def __init__(self) -> None:
+        self.commands: list[dict] = []
+        self._pending: dict[int, tuple[float, dict]] = {}
+
+    def start(self, event: monitoring.CommandStartedEvent) -> None:
+        name = event.command_name
+        command = {
+            key: value
+            for key, value in event.command.items()
+            if key not in DRIVER_COMMAND_FIELDS
+        }
+        target = command.get(name)
+        record = {
+            "command": name,
+            "database": event.database_name,
+            "collection": target if isinstance(target, str) else None,
+            "shape": shape_of(
+                {key: value for key, value in command.items() if key != name}
+            ),
+            "_command": command,
+        }
+        self._pending[event.request_id] = (time.perf_counter(), record)
+
+    def finish(self, event, failed: bool = False) -> None:
+        started, record = self._pending.pop(event.request_id, (None, None))
+        if record is None:
+            return
+
+        record["duration_ms"] = (time.perf_counter() - started) * 1000
+        record["failed"] = failed
+        self.commands.append(record)
+
+
+tracked_commands: ContextVar[TrackedCommands | None] = ContextVar(
+    "tracked_commands",
+    default=None,
+)
+
+
+class CommandTracker(monitoring.CommandListener):
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        tracker = tracked_commands.get()
+        if tracker is not None:
+            tracker.start(event)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        tracker = tracked_commands.get()
+        if tracker is not None:
+            tracker.finish(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        tracker = tracked_commands.get()
+        if tracker is not None:
+            tracker.finish(event, failed=True)
@@ -0,0 +1,454 @@
+import asyncio
+import time
+import zlib
+from datetime import datetime, timezone
+
+import orjson
+from bson import ObjectId
+from pydantic import BaseModel, TypeAdapter
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.database.breaker import reading, writing
+from app.database.db import db
+from app.database.models import (
+    User,
+    UserInfo,
+    UserPermission,
+    Article,
+    ArticleBodyChunk,
+    AuditEvent,
+    RefreshToken,
+)
+
+
+def dump_document(model: BaseModel, **kwargs) -> dict:
+    return orjson.loads(model.model_dump_json(**kwargs))
+
+
+# Dates are stored the way `dump_document` serializes them, as naive local
+# time from `datetime.now`, so aware values are converted to that first
+def dump_datetime(value: datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return TypeAdapter(datetime).dump_python(value, mode="json")
+
+
+class Repository:
+    name: str
+    model: type[BaseModel]
+
+    def __init__(self, database) -> None:
+        self.database = database
+        # Serialized filter: (expires at, count)
+        self.counts: dict[bytes, tuple[float, int]] = {}
+
+    @property
+    def collection(self):
+        return self.database.get_collection(self.name)
+
+    def to_model(self, item: dict | None, model: type[BaseModel] | None = None):
+        if item is None:
+            return None
+
+        model = model or self.model
+        if "id" not in model.model_fields:
+            item.pop("_id", None)
+        return model(**item)
+
+    async def insert(self, item: BaseModel) -> ObjectId:
+        with writing():
+            result = await self.collection.insert_one(dump_document(item))
+        return result.inserted_id
+
+    async def find_one(
+        self,
+        filter: dict,
+        model: type[BaseModel] | None = None,
+        projection: dict | None = None,
+    ):
+        with reading():
+            item = await self.collection.find_one(filter, projection)
+        return self.to_model(item, model)
+
+    async def insert_many(self, documents: list[dict]) -> tuple[int, int]:
+        if not documents:
+            return (0, 0)
+
+        try:
+            with writing():
+                result = await self.collection.insert_many(documents, ordered=False)
+            return (len(result.inserted_ids), 0)
+        except BulkWriteError as e:
+            errors = e.details["writeErrors"]
+            await self.discard([documents[error["index"]] for error in errors])
+            if any(error["code"] != 11000 for error in errors):
+                raise
+            return (e.details["nInserted"], len(errors))
+
+    async def discard(self, documents: list[dict]) -> None:
+        # Documents `insert_many` could not write, for what was stored with them
+        pass
+
+    def iterate(self, after: ObjectId | None = None, batch_size: int = 1000):
+        filter = {"_id": {"$gt": after}} if after is not None else {}
+        return self.collection.find(filter).sort("_id", 1).batch_size(batch_size)
+
+    async def find(
+        self,
+        filter: dict | None = None,
+        projection: dict | None = None,
+    ) -> list[dict]:
+        return await self.fetch(self.collection.find(filter or {}, projection))
+
+    async def fetch(self, cursor) -> list[dict]:
+        with reading():
+            return await cursor.to_list()
+
+    async def update_one(
+        self,
+        filter: dict,
+        fields: dict,
+        model: type[BaseModel] | None = None,
+        projection: dict | None = None,
+    ):
+        with writing():
+            item = await self.collection.find_one_and_update(
+                filter,
+                {"$set": fields},
+                projection=projection,
+                return_document=ReturnDocument.AFTER,
+            )
+        return self.to_model(item, model)
+
+    async def delete_one(self, filter: dict) -> bool:
+        with writing():
+            result = await self.collection.delete_one(filter)
+        return result.deleted_count == 1
+
+    async def update_many(self, filter: dict, fields: dict) -> tuple[int, int]:
+        with writing():
+            result = await self.collection.update_many(filter, {"$set": fields})
+        return (result.matched_count, result.modified_count)
+
+    async def delete_many(self, filter: dict) -> int:
+        with writing():
+            result = await self.collection.delete_many(filter)
+        return result.deleted_count
+
+    async def count(self, filter: dict | None = None, exact: bool = False) -> int:
+        if exact:
+            with reading():
+                return await self.collection.count_documents(filter or {})
+
+        if not filter:
+            # Read from the collection metadata instead of scanning
+            with reading():
+                return await self.collection.estimated_document_count()
+
+        key = orjson.dumps(filter, option=orjson.OPT_SORT_KEYS)
+        now = time.monotonic()
+        cached = self.counts.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        with reading():
+            count = await self.collection.count_documents(filter)
+
+        if len(self.counts) >= settings.COUNT_CACHE_SIZE:
+            self.counts = {
+                key: cached for key, cached in self.counts.items() if cached[0] > now
+            }
+            if len(self.counts) >= settings.COUNT_CACHE_SIZE:
+                self.counts.clear()
+        self.counts[key] = (now + settings.COUNT_CACHE_TTL, count)
+        return count
+
+    async def exists(self, filter: dict) -> bool:
+        with reading():
+            return await self.collection.count_documents(filter, limit=1) == 1
+
+
+class UserRepository(Repository):
+    name = "users"
+    model = User
+
+    info_projection = {"passwd_hash": 0}
+
+    async def get_by_username(self, username: str) -> User | None:
+        return await self.find_one({"username": username})
+
+    async def update_info(self, filter: dict, fields: dict) -> UserInfo | None:
+        return await self.update_one(
+            filter,
+            fields,
+            model=UserInfo,
+            projection=self.info_projection,
+        )
+
+    async def set_permission_where(
+        self,
+        filter: dict,
+        permission: UserPermission,
+    ) -> int:
+        # Users whose permission changes also lose their sessions, tokens
+        # issued before tokens_not_before are rejected
+        fields = dump_document(
+            User.model_construct(
+                permission=permission,
+                tokens_not_before=datetime.now(timezone.utc),
+            ),
+            include={"permission", "tokens_not_before"},
+        )
+        _, modified = await self.update_many(
+            {"$and": [filter, {"permission": {"$ne": permission.value}}]},
+            fields,
+        )
+        return modified
+
+
+def compress_chunks(body: str, chunk_size: int) -> list[tuple[int, int, bytes]]:
+    return [
+        (
+            offset,
+            min(offset + chunk_size, len(body)),
+            zlib.compress(
+                body[offset:offset + chunk_size].encode(),
+                settings.BODY_COMPRESSION_LEVEL,
+            ),
+        )
+        for offset in range(0, len(body), chunk_size)
+    ]
+
+
+class ArticleBodyRepository(Repository):
+    name = "article_bodies"
+    model = ArticleBodyChunk
+
+    async def save(self, body: str) -> str:
+        body_id = str(ObjectId())
+        chunks = await asyncio.to_thread(
+            compress_chunks, body, settings.BODY_CHUNK_SIZE
+        )
+        with writing():
+            await self.collection.insert_many([
+                {"body_id": body_id, "offset": offset, "end": end, "data": data}
+                for offset, end, data in chunks
+            ])
+        return body_id
+
+    async def stream(
+        self,
+        body_id: str,
+        offset: int = 0,
+        length: int | None = None,
+    ):
+        filter = {"body_id": body_id, "end": {"$gt": offset}}
+        if length is not None:
+            filter["offset"] = {"$lt": offset + length}
+
+        # One chunk per batch, a range read never holds the whole body
+        cursor = self.collection.find(filter).sort("offset", 1).batch_size(1)
+        async for chunk in cursor:
+            text = zlib.decompress(chunk["data"]).decode()
+            start = max(offset - chunk["offset"], 0)
+            stop = None if length is None else offset + length - chunk["offset"]
+            yield text[start:stop]
+
+    async def read(
+        self,
+        body_id: str,
+        offset: int = 0,
+        length: int | None = None,
+    ) -> str:
+        with reading():
+            return "".join([
+                text async for text in self.stream(body_id, offset, length)
+            ])
+
+    async def delete(self, body_id: str) -> None:
+        with writing():
+            await self.collection.delete_many({"body_id": body_id})
+
+
+class ArticleRepository(Repository):
+    name = "articles"
+    model = Article
+
+    def __init__(self, database, bodies: ArticleBodyRepository) -> None:
+        super().__init__(database)
+        self.bodies = bodies
+
+    info_projection = {
+        "_id": 1,
+        "title": 1,
+        "author": 1,
+        "pub_date": 1,
+        "mod_date": 1,
+    }
+
+    async def get(self, id: str) -> Article | None:
+        return await self.find_one({"_id": ObjectId(id)})
+
+    async def store_body(self, fields: dict) -> None:
+        if "body" not in fields:
+            return
+
+        body = fields["body"]
+        if body is None or len(body) <= settings.BODY_EXTERNAL_THRESHOLD:
+            fields.update(body_id=None, body_size=None)
+        else:
+            fields.update(
+                body=None,
+                body_id=await self.bodies.save(body),
+                body_size=len(body),
+            )
+
+    async def read_body(
+        self,
+        article: Article,
+        offset: int = 0,
+        length: int | None = None,
+    ) -> str | None:
+        if article.body_id is None:
+            if article.body is None:
+                return None
+            return article.body[offset:None if length is None else offset + length]
+        return await self.bodies.read(article.body_id, offset, length)
+
+    async def insert(self, item: Article) -> ObjectId:
+        document = dump_document(item)
+        await self.store_body(document)
+        try:
+            with writing():
+                result = await self.collection.insert_one(document)
+        except Exception:
+            if document["body_id"] is not None:
+                await self.bodies.delete(document["body_id"])
+            raise
+
+        item.body = document["body"]
+        item.body_id, item.body_size = document["body_id"], document["body_size"]
+        return result.inserted_id
+
+    async def insert_many(self, documents: list[dict]) -> tuple[int, int]:
+        for document in documents:
+            await self.store_body(document)
+        return await super().insert_many(documents)
+
+    async def discard(self, documents: list[dict]) -> None:
+        # Rerunning a seed or an import rejects every row already present
+        for document in documents:
+            if document.get("body_id") is not None:
+                await self.bodies.delete(document["body_id"])
+
+    async def update_one(
+        self,
+        filter: dict,
+        fields: dict,
+        model: type[BaseModel] | None = None,
+    ):
+        # No projection, the whole previous document is needed to find the
+        # body it replaces and to build the updated model
+        await self.store_body(fields)
+        body_id = fields.get("body_id")
+        try:
+            with writing():
+                before = await self.collection.find_one_and_update(
+                    filter,
+                    {"$set": fields},
+                    return_document=ReturnDocument.BEFORE,
+                )
+        except Exception:
+            if body_id is not None:
+                await self.bodies.delete(body_id)
+            raise
+
+        if before is None:
+            if body_id is not None:
+                await self.bodies.delete(body_id)
+            return None
+
+        if "body_id" in fields and before.get("body_id") not in (None, body_id):
+            await self.bodies.delete(before["body_id"])
+        return self.to_model({**before, **fields}, model)
+
+    async def delete_one(self, filter: dict) -> bool:
+        with writing():
+            item = await self.collection.find_one_and_delete(
+                filter, projection={"body_id": 1}
+            )
+        if item is None:
+            return False
+
+        if item.get("body_id") is not None:
+            await self.bodies.delete(item["body_id"])
+        return True
+
+    def filter(
+        self,
+        author: str | None = None,
+        published_after: datetime | None = None,
+        published_before: datetime | None = None,
+    ) -> dict:
+        filter = {}
+        if author is not None:
+            filter["author"] = author
+
+        pub_date = {}
+        if published_after is not None:
+            pub_date["$gte"] = dump_datetime(published_after)
+        if published_before is not None:
+            pub_date["$lt"] = dump_datetime(published_before)
+        if pub_date:
+            filter["pub_date"] = pub_date
+        return filter
+
+    def query(
+        self,
+        author: str | None = None,
+        published_after: datetime | None = None,
+        published_before: datetime | None = None,
+        newest_first: bool = True,
+    ):
+        filter = self.filter(author, published_after, published_before)
+        return self.collection.find(filter, self.info_projection).sort(
+            "pub_date",
+            DESCENDING if newest_first else ASCENDING,
+        )
+
+
+class RefreshTokenRepository(Repository):
+    name = "refresh_tokens"
+    model = RefreshToken
+
+    async def insert(self, item: RefreshToken) -> ObjectId:
+        document = dump_document(item, exclude={"expires_at"})
+        document["expires_at"] = item.expires_at
+        with writing():
+            result = await self.collection.insert_one(document)
+        return result.inserted_id
+
+    async def consume(self, token_hash: str, now: datetime) -> RefreshToken | None:
+        # The TTL monitor runs about once a minute, expired tokens may linger
+        with writing():
+            item = await self.collection.find_one_and_delete(
+                {"token_hash": token_hash, "expires_at": {"$gt": now}}
+            )
+        return self.to_model(item)
+
+    async def revoke(self, token_hash: str) -> bool:
+        return await self.delete_one({"token_hash": token_hash})
+
+
+class AuditEventRepository(Repository):
+    name = "audit_events"
+    model = AuditEvent
+
+
+users = UserRepository(db)
+article_bodies = ArticleBodyRepository(db)
+articles = ArticleRepository(db, article_bodies)
+refresh_tokens = RefreshTokenRepository(db)
+audit_events = AuditEventRepository(db)
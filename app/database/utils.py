@@ -1,27 +1,55 @@
+import asyncio
+import hashlib
+import secrets
 from datetime import datetime, timezone, timedelta
 
 import bcrypt
 import jwt
-import orjson
-from pydantic import BaseModel, ValidationError
+from pydantic import ValidationError
+from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
 
 from app.config import settings
-from app.database.db import db
+from app.database import repository
 from app.database.models import (
     UserLogin,
     UserPermission,
     User,
+    RefreshToken,
 )
 
 
+background_tasks: set[asyncio.Task] = set()
+
+
+def run_in_background(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+
+def hash_cost(pw_hash: bytes) -> int:
+    # bcrypt hashes look like b"$2b$12$<salt and checksum>"
+    return int(pw_hash.split(b"$")[2])
+
+
 async def password_hasher(passwd: str) -> bytes:
-    salt = bcrypt.gensalt()
-    pw_hash = bcrypt.hashpw(passwd.encode(), salt)
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+    pw_hash = await asyncio.to_thread(bcrypt.hashpw, passwd.encode(), salt)
 
     return pw_hash
 
 
+async def rehash_password(user: User, passwd: str) -> None:
+    pw_hash = await password_hasher(passwd)
+    # Matching the old hash keeps a concurrent password change intact
+    await repository.users.update_one(
+        {"username": user.username, "passwd_hash": user.passwd_hash.decode()},
+        {"passwd_hash": pw_hash.decode()},
+    )
+
+
 async def create_user(
     login: UserLogin,
     permission: UserPermission = UserPermission.guest,
@@ -37,23 +65,27 @@ async def create_user(
             permission=permission,
             f_name=f_name,
             l_name=l_name,
+            # Tokens left behind by a deleted user of the same name
+            tokens_not_before=datetime.now(timezone.utc),
         )
 
-        result = await db.users.insert_one(orjson.loads(user.model_dump_json()))
+        inserted_id = await repository.users.insert(user)
 
-        assert isinstance(result.inserted_id, ObjectId)
+        assert isinstance(inserted_id, ObjectId)
         return user
-    except (ValidationError, AssertionError):
+    except (ValidationError, AssertionError, DuplicateKeyError):
         return None
 
 
 async def create_token(user: User) -> str | None:
     try:
+        now = datetime.now(timezone.utc)
         token = jwt.encode(
             payload={
                 "username": user.username,
-                "exp": datetime.now(timezone.utc) +
-                    timedelta(minutes=settings.TOKEN_EXPIRED_TIME),
+                # Fractional, whole seconds could predate tokens_not_before
+                "iat": now.timestamp(),
+                "exp": now + timedelta(minutes=settings.TOKEN_EXPIRED_TIME),
             },
             key=settings.SECRET_KEY,
             algorithm=settings.TOKEN_ALGORITHM,
@@ -65,17 +97,46 @@ async def create_token(user: User) -> str | None:
         raise
 
 
-async def find_one_or_404(filter: dict, collection, model: BaseModel):
+def refresh_token_hash(token: str) -> str:
+    # Refresh tokens are random, a fast hash is enough to keep them opaque
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def create_refresh_token(user: User) -> str:
+    token = secrets.token_urlsafe(32)
+    now = datetime.now(timezone.utc)
+    await repository.refresh_tokens.insert(
+        RefreshToken(
+            username=user.username,
+            token_hash=refresh_token_hash(token),
+            expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRED_TIME),
+            issued_at=now,
+        )
+    )
+    return token
+
+
+async def rotate_refresh_token(token: str) -> tuple[User, str] | None:
     try:
-        assert await collection.count_documents(filter) == 1
+        refresh_token = await repository.refresh_tokens.consume(
+            refresh_token_hash(token),
+            now=datetime.now(timezone.utc),
+        )
+        assert refresh_token is not None
+
+        user = await repository.users.get_by_username(refresh_token.username)
+        assert user is not None
+        if user.tokens_not_before is not None:
+            assert refresh_token.issued_at is not None
+            assert refresh_token.issued_at >= user.tokens_not_before
 
-        item = await collection.find(filter).next()
-        item.pop("_id")
-        return model(**item)
+        return (user, await create_refresh_token(user))
     except AssertionError:
         return None
-    except Exception:
-        raise
+
+
+async def revoke_refresh_token(token: str) -> bool:
+    return await repository.refresh_tokens.revoke(refresh_token_hash(token))
 
 
 async def authenticate(
@@ -83,19 +144,19 @@ async def authenticate(
     permission: UserPermission | None = None,
 ) -> User | None:
     try:
-        user = await find_one_or_404(
-            filter={ "username": login.username },
-            collection=db.get_collection("users"),
-            model=User
-        )
+        user = await repository.users.get_by_username(login.username)
         assert user is not None
-        assert bcrypt.checkpw(
+        assert await asyncio.to_thread(
+            bcrypt.checkpw,
             password=login.password.encode(),
             hashed_password=user.passwd_hash,
         )
         if permission is not None:
             assert user.permission is permission
 
+        if hash_cost(user.passwd_hash) != settings.BCRYPT_ROUNDS:
+            run_in_background(rehash_password(user, login.password))
+
         return user
     except AssertionError:
         return None
@@ -103,6 +164,19 @@ async def authenticate(
         raise
 
 
+def token_username(token: str | None) -> str | None:
+    # Identifies the caller without the user lookup of `auth_token`
+    try:
+        payload = jwt.decode(
+            jwt=token,
+            key=settings.SECRET_KEY,
+            algorithms=[settings.TOKEN_ALGORITHM],
+        )
+        return payload["username"]
+    except (jwt.InvalidTokenError, KeyError):
+        return None
+
+
 async def auth_token(
     token: str,
     permission: UserPermission | None = None
@@ -113,12 +187,10 @@ async def auth_token(
             key=settings.SECRET_KEY,
             algorithms=[settings.TOKEN_ALGORITHM],
         )
-        user = await find_one_or_404(
-            filter={ "username": payload["username"]},
-            collection=db.get_collection("users"),
-            model=User,
-        )  
+        user = await repository.users.get_by_username(payload["username"])
         assert user is not None
+        if user.tokens_not_before is not None:
+            assert payload.get("iat", 0) >= user.tokens_not_before.timestamp()
         if permission is not None:
             assert user.permission == permission
 
@@ -1,21 +1,38 @@
+import asyncio
 from contextlib import asynccontextmanager
 
-import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 
+from app import startup, transfer
 from app.config import settings
+from app.database.audit import audit_log
+from app.database.breaker import BreakerState, DatabaseUnavailable, breaker
 from app.database.db import client, run_db_setup
+from app.database.utils import background_tasks
+from app.profiling import ProfilingMiddleware
 from app.schema import graphql_app
+from app.schema.coalescing import reads
+from app.schema.slowlog import start_slow_log, stop_slow_log
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await run_db_setup()
+    with startup.phase("db_setup"):
+        await run_db_setup()
+    with startup.phase("background"):
+        audit_log.start()
+        if settings.SLOW_OPERATION_THRESHOLD is not None:
+            start_slow_log()
+    startup.report()
 
     yield
 
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await audit_log.stop()
+    await stop_slow_log()
     await client.close()
 
 
@@ -34,10 +51,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.add_middleware(GZipMiddleware, minimum_size=800, compresslevel=5)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
 
 
 app.include_router(graphql_app, prefix="/graphql")
+app.include_router(transfer.router)
+
+
+@app.exception_handler(DatabaseUnavailable)
+async def database_unavailable(request: Request, exc: DatabaseUnavailable):
+    return ORJSONResponse(
+        {"detail": "Database is unavailable."},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+@app.get("/ready")
+async def ready() -> ORJSONResponse:
+    return ORJSONResponse(
+        {
+            "breaker": breaker.snapshot(),
+            "coalescing": reads.snapshot(),
+            "audit": audit_log.snapshot(),
+            "startup": startup.phases,
+        },
+        status_code=(
+            status.HTTP_503_SERVICE_UNAVAILABLE
+            if breaker.state is BreakerState.open
+            else status.HTTP_200_OK
+        ),
+    )
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app)
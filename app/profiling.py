@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import hmac
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from app.config import settings
+
+PROFILE_HEADER = b"x-profile"
+
+
+def sign(timestamp: int) -> str:
+    signature = hmac.new(
+        settings.SECRET_KEY.encode(),
+        str(timestamp).encode(),
+        hashlib.sha256,
+    ).hexdigest()
+    return f"{timestamp}.{signature}"
+
+
+def verify(value: str) -> bool:
+    try:
+        timestamp, _ = value.split(".", 1)
+        age = time.time() - int(timestamp)
+    except ValueError:
+        return False
+
+    if not 0 <= age <= settings.PROFILING_SIGNATURE_TTL:
+        return False
+    return hmac.compare_digest(value, sign(int(timestamp)))
+
+
+class ProfilingMiddleware:
+    def __init__(self, app) -> None:
+        # Only installed when profiling is enabled, so a missing optional
+        # dependency fails at startup instead of on the first request.
+        from pyinstrument import Profiler
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        self.app = app
+        self.profiler_class = Profiler
+        self.renderer_class = SpeedscopeRenderer
+        Path(settings.PROFILING_DIR).mkdir(parents=True, exist_ok=True)
+
+    def requested(self, scope) -> bool:
+        if scope["type"] != "http" or not scope["path"].startswith("/graphql"):
+            return False
+
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return verify(value.decode("latin-1"))
+        return False
+
+    async def __call__(self, scope, receive, send) -> None:
+        if not self.requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_path = Path(settings.PROFILING_DIR) / f"{uuid4().hex}.speedscope.json"
+
+        async def send_with_profile(message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-profile-file", str(profile_path).encode()),
+                ]
+            await send(message)
+
+        profiler = self.profiler_class(
+            interval=settings.PROFILING_INTERVAL,
+            async_mode="enabled",
+        )
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            profiler.stop()
+            await asyncio.to_thread(
+                profile_path.write_text,
+                profiler.output(self.renderer_class()),
+                encoding="utf-8",
+            )
+
+
+if __name__ == "__main__":
+    # Prints a header value: curl -H "X-Profile: $(python -m app.profiling)"
+    print(sign(int(time.time())))
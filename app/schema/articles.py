@@ -1,96 +1,201 @@
-import orjson
+from datetime import datetime
+
 import strawberry as sb
 from bson import ObjectId
 from fastapi import status
 from pydantic import ValidationError
 from pymongo.errors import DuplicateKeyError
 
-from app.database.db import db
-from app.database.utils import find_one_or_404
-from app.database.models import Article, ArticleList
+from app.database import repository
+from app.database.audit import audit_log
+from app.database.breaker import DatabaseUnavailable
+from app.database.repository import dump_datetime, dump_document
+from .coalescing import reads
 from .depends import (
     ResultStatus,
-    ArticleType,
     ArticleResult,
     ArticleInput,
-    ArticleListType,
     ArticleListResult,
+    ArticleSort,
+    Context,
+    article_list_from_documents,
+    article_type_from_model,
+    selects,
 )
 
+ARTICLE_INPUT_FIELDS = {"title", "author", "body", "summary"}
+
 
 @sb.type
 class Query:
     @sb.field
-    async def articles_list(self) -> ArticleListResult:
+    async def articles_list(self, info: sb.Info[Context]) -> ArticleListResult:
         try:
-            articles = ArticleList(
-                root=await db["articles"].find(
-                {}, {"_id": 1, "title": 1, "author": 1, "pub_date": 1, "mod_date": 1}
-                ).to_list()
+            # Only counting, the count does not need the documents
+            if not selects(info, "root"):
+                return article_list_from_documents([])
+
+            articles = await reads.do(
+                ("articlesList",),
+                lambda: repository.articles.find(
+                    {}, repository.articles.info_projection
+                ),
             )
-            return ArticleListType.from_pydantic(articles)
+            info.context.cacheable(
+                info,
+                ((str(article["_id"]), article["mod_date"]) for article in articles),
+            )
+            return article_list_from_documents(articles)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
         except Exception:
             return ResultStatus(status_code=status.HTTP_404_NOT_FOUND)
 
 
     @sb.field
-    async def article(self, id: str) -> ArticleResult:
+    async def articles(
+        self,
+        info: sb.Info[Context],
+        author: str | None = None,
+        published_after: datetime | None = None,
+        published_before: datetime | None = None,
+        sort: ArticleSort = ArticleSort.newest,
+    ) -> ArticleListResult:
+        try:
+            filter = repository.articles.filter(
+                author, published_after, published_before
+            )
+            if not selects(info, "root"):
+                return article_list_from_documents([], filter)
+
+            articles = await reads.do(
+                ("articles", author, published_after, published_before, sort),
+                lambda: repository.articles.fetch(
+                    repository.articles.query(
+                        author=author,
+                        published_after=published_after,
+                        published_before=published_before,
+                        newest_first=sort is ArticleSort.newest,
+                    )
+                ),
+            )
+            info.context.cacheable(
+                info,
+                ((str(article["_id"]), article["mod_date"]) for article in articles),
+            )
+            return article_list_from_documents(articles, filter)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+    @sb.field
+    async def article(self, info: sb.Info[Context], id: str) -> ArticleResult:
         try:
-            article = await find_one_or_404(
-                filter={"_id": ObjectId(id)},
-                collection=db.get_collection("articles"),
-                model=Article
+            article = await reads.do(
+                ("article", id), lambda: repository.articles.get(id)
             )
             assert article is not None
-            return ArticleType.from_pydantic(article)
+            info.context.cacheable(info, [(id, dump_datetime(article.mod_date))])
+            return article_type_from_model(article)
         except AssertionError:
             return ResultStatus(status_code=status.HTTP_404_NOT_FOUND)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 @sb.type
 class Mutation:
     @sb.field
-    async def create_article(self, input: ArticleInput) -> ArticleResult:
+    async def create_article(
+        self,
+        info: sb.Info[Context],
+        input: ArticleInput,
+    ) -> ArticleResult:
         try:
             article = input.to_pydantic()
 
-            result = await db["articles"].insert_one(
-                orjson.loads(article.model_dump_json())
+            inserted_id = await repository.articles.insert(article)
+            assert isinstance(inserted_id, ObjectId)
+            await audit_log.record(
+                "create_article",
+                actor=info.context.username(),
+                target=str(inserted_id),
+                changes={"title": article.title, "author": article.author},
             )
-            assert isinstance(result.inserted_id, ObjectId)
 
-            return ArticleType.from_pydantic(article)
+            return article_type_from_model(article)
         except ValidationError:
             return ResultStatus(status_code=status.HTTP_400_BAD_REQUEST)
         except DuplicateKeyError:
             return ResultStatus(status_code=status.HTTP_409_CONFLICT)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 
     @sb.field
-    async def update_article(self, id: str, input: ArticleInput) -> ArticleResult:
+    async def update_article(
+        self,
+        info: sb.Info[Context],
+        id: str,
+        input: ArticleInput,
+        expected_mod_date: datetime | None = None,
+    ) -> ArticleResult:
         try:
             article = input.to_pydantic()
 
-            modified = await db["articles"].update_one(
-                {"_id": ObjectId(id)},
-                {"$set": orjson.loads(article.model_dump_json())},
+            article_filter = {"_id": ObjectId(id)}
+            if expected_mod_date is not None:
+                article_filter["mod_date"] = dump_datetime(expected_mod_date)
+
+            fields = dump_document(
+                article,
+                include=ARTICLE_INPUT_FIELDS | {"mod_date"},
             )
-            assert modified.matched_count == 1
-            assert modified.modified_count == 1
+            updated = await repository.articles.update_one(article_filter, fields)
+            if updated is not None:
+                await audit_log.record(
+                    "update_article",
+                    actor=info.context.username(),
+                    target=id,
+                    # Bodies can be large, their length is enough here
+                    changes={
+                        "title": article.title,
+                        "author": article.author,
+                        "summary": article.summary,
+                        "body_size": updated.body_size or len(updated.body or ""),
+                    },
+                )
+                return article_type_from_model(updated)
 
-            return ArticleType.from_pydantic(article)
+            if (
+                expected_mod_date is not None and
+                await repository.articles.exists({"_id": ObjectId(id)})
+            ):
+                return ResultStatus(
+                    message="Article was modified concurrently.",
+                    status_code=status.HTTP_409_CONFLICT,
+                )
+            return ResultStatus(status_code=status.HTTP_404_NOT_FOUND)
         except ValidationError:
             return ResultStatus(
                 message="Invalid fields.",
                 status_code=status.HTTP_400_BAD_REQUEST)
-        except AssertionError:
-            return ResultStatus(status_code=status.HTTP_404_NOT_FOUND)
+        except DuplicateKeyError:
+            return ResultStatus(status_code=status.HTTP_409_CONFLICT)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 
     @sb.field
-    async def delete_article(self, id: str) -> ResultStatus:
+    async def delete_article(self, info: sb.Info[Context], id: str) -> ResultStatus:
         try:
-            deleted = await db["articles"].delete_one({"_id": ObjectId(id)})
-            assert deleted.deleted_count == 1
+            assert await repository.articles.delete_one({"_id": ObjectId(id)})
+            await audit_log.record(
+                "delete_article",
+                actor=info.context.username(),
+                target=id,
+            )
             return ResultStatus(status_code=status.HTTP_204_NO_CONTENT)
         except AssertionError:
-            return ResultStatus(status_code=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+            return ResultStatus(status_code=status.HTTP_404_NOT_FOUND)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
\ No newline at end of file
@@ -0,0 +1,112 @@
+import hashlib
+
+import orjson
+from fastapi import Response, status
+from graphql import FieldNode, OperationDefinitionNode
+from strawberry.extensions import SchemaExtension
+from strawberry.fastapi import GraphQLRouter
+from strawberry.types.graphql import OperationType
+
+from app.config import settings
+
+
+def max_age(policy: str) -> int:
+    for directive in policy.split(","):
+        name, _, value = directive.strip().partition("=")
+        if name == "max-age":
+            return int(value)
+    return 0
+
+
+# (field name, response key) of every top level field
+def top_level_fields(
+    document,
+    operation_name: str | None,
+) -> list[tuple[str, str]] | None:
+    for definition in document.definitions:
+        if not isinstance(definition, OperationDefinitionNode):
+            continue
+        if operation_name and definition.name and definition.name.value != operation_name:
+            continue
+
+        selections = definition.selection_set.selections
+        if not all(isinstance(selection, FieldNode) for selection in selections):
+            return None
+        return [
+            (
+                selection.name.value,
+                (selection.alias or selection.name).value,
+            )
+            for selection in selections
+        ]
+    return None
+
+
+def cache_policy(fields: list[str] | None) -> str | None:
+    if not fields:
+        return None
+
+    policies = []
+    for field in fields:
+        if field not in settings.CACHE_CONTROL:
+            return None
+        policies.append(settings.CACHE_CONTROL[field])
+    # The operation is only as cacheable as its shortest lived field
+    return min(policies, key=max_age)
+
+
+def entity_tag(query: str, variables: dict | None, keys: list[tuple]) -> str:
+    digest = hashlib.sha256()
+    digest.update(query.encode())
+    digest.update(orjson.dumps(variables or {}, option=orjson.OPT_SORT_KEYS))
+    for key in sorted(keys):
+        digest.update(orjson.dumps(key, default=str))
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+class HttpCaching(SchemaExtension):
+    def on_operation(self):
+        yield
+
+        context = self.execution_context
+        request = getattr(context.context, "request", None)
+        response = getattr(context.context, "response", None)
+        if (
+            request is None or
+            request.method != "GET" or
+            response is None or
+            context.graphql_document is None or
+            context.errors or
+            context.operation_type is not OperationType.QUERY
+        ):
+            return
+
+        fields = top_level_fields(context.graphql_document, context.operation_name)
+        if fields is None:
+            return
+        # A field that answered with a ResultStatus, a 503 for one, must not
+        # be cached, only fields that reported their documents are
+        if any(key not in context.context.cached_fields for _, key in fields):
+            return
+
+        policy = cache_policy([name for name, _ in fields])
+        if policy is None:
+            return
+
+        etag = entity_tag(context.query, context.variables, context.context.cache_keys)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = policy
+
+        if_none_match = request.headers.get("If-None-Match", "")
+        if etag in (tag.strip() for tag in if_none_match.split(",")):
+            response.status_code = status.HTTP_304_NOT_MODIFIED
+
+
+class CachingGraphQLRouter(GraphQLRouter):
+    def create_response(self, response_data, sub_response: Response) -> Response:
+        if sub_response.status_code == status.HTTP_304_NOT_MODIFIED:
+            # The client already has this body, skip encoding it again
+            response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+            response.headers.raw.extend(sub_response.headers.raw)
+            return response
+        return super().create_response(response_data, sub_response)
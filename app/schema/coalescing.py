@@ -0,0 +1,40 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self.calls: dict[Hashable, asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self.calls.get(key) is future:
+            del self.calls[key]
+        # Nobody may be left waiting, don't warn about an unretrieved error
+        if not future.cancelled():
+            future.exception()
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable]):
+        future = self.calls.get(key)
+        if future is None:
+            self.executed += 1
+            future = asyncio.ensure_future(call())
+            self.calls[key] = future
+            future.add_done_callback(lambda done: self.forget(key, done))
+        else:
+            self.coalesced += 1
+
+        # A cancelled caller must not cancel the call the others wait for
+        return await asyncio.shield(future)
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": len(self.calls),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
+
+
+# Concurrent identical reads, keyed by field name and arguments
+reads = SingleFlight()
@@ -1,9 +1,14 @@
+from datetime import datetime
+from enum import Enum
 from typing import Annotated
 
 import strawberry as sb
 from strawberry.fastapi import BaseContext
+from strawberry.types.nodes import SelectedField
 
-from app.database.utils import auth_token
+from app.database import repository
+from app.database.breaker import DatabaseUnavailable
+from app.database.utils import auth_token, token_username
 from app.database.models import (
     UserLogin,
     UserPermission,
@@ -29,8 +34,31 @@ class ArticleType:
     author: sb.auto
     pub_date: sb.auto
     mod_date:sb.auto
-    body: sb.auto
     summary: sb.auto
+    article: sb.Private[Article | None] = None
+
+    # Large bodies live in article_bodies, only read them when selected
+    @sb.field
+    async def body(self) -> str | None:
+        return await repository.articles.read_body(self.article)
+
+    @sb.field
+    async def body_slice(self, offset: int = 0, length: int | None = None) -> str | None:
+        if offset < 0 or (length is not None and length < 0):
+            raise ValueError("Offset and length must not be negative.")
+        return await repository.articles.read_body(self.article, offset, length)
+
+    @sb.field
+    def body_size(self) -> int | None:
+        if self.article.body_id is not None:
+            return self.article.body_size
+        return len(self.article.body) if self.article.body is not None else None
+
+
+def article_type_from_model(article: Article) -> ArticleType:
+    article_type = ArticleType.from_pydantic(article)
+    article_type.article = article
+    return article_type
 
 
 ArticleResult = Annotated[
@@ -59,6 +87,62 @@ class ArticleInfoType:
 @sb.experimental.pydantic.type(model=ArticleList)
 class ArticleListType:
     root: sb.auto
+    filter: sb.Private[dict | None] = None
+
+    @sb.field
+    async def total_count(self, exact: bool = False) -> int | None:
+        try:
+            return await repository.articles.count(self.filter, exact)
+        except DatabaseUnavailable:
+            return None
+
+
+@sb.enum
+class ArticleSort(Enum):
+    newest = "newest"
+    oldest = "oldest"
+
+
+def to_datetime(value: datetime | str) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def selects(info: sb.Info, name: str) -> bool:
+    # Whether the current field selects `name`, directly or in fragments
+    def search(selections) -> bool:
+        for selection in selections:
+            if isinstance(selection, SelectedField):
+                if selection.name == name:
+                    return True
+            elif search(selection.selections):
+                return True
+        return False
+
+    return search(info.selected_fields[0].selections)
+
+
+# Fast paths for documents read back from the validated collections, they
+# skip the pydantic models that `from_pydantic` would build for every row.
+def article_info_from_document(document: dict) -> ArticleInfoType:
+    return ArticleInfoType(
+        id=str(document["_id"]),
+        title=document["title"],
+        author=document["author"],
+        pub_date=to_datetime(document["pub_date"]),
+        mod_date=to_datetime(document["mod_date"]),
+    )
+
+
+def article_list_from_documents(
+    documents: list[dict],
+    filter: dict | None = None,
+) -> ArticleListType:
+    return ArticleListType(
+        root=[article_info_from_document(document) for document in documents],
+        filter=filter,
+    )
 
 
 ArticleListResult = Annotated[
@@ -88,16 +172,52 @@ UserInfoResult = Annotated[
 ]
 
 
-@sb.experimental.pydantic.input(model=UserInfo)
+# Not derived from UserInfo, whose defaults would turn omitted fields into
+# nulls, only the fields a client sends are updated
+@sb.input
 class UserInfoInput:
-    username: sb.auto
-    f_name: sb.auto
-    l_name: sb.auto
+    # Nullable only so it can be left out, GraphQL makes a non-null field
+    # without a default required; update_info rejects null
+    username: str | None = sb.UNSET
+    f_name: str | None = sb.UNSET
+    l_name: str | None = sb.UNSET
+
+    def provided(self) -> dict:
+        return {
+            name: value
+            for name, value in vars(self).items()
+            if value is not sb.UNSET
+        }
 
 
 @sb.experimental.pydantic.type(model=UserList)
 class UserListType:
     root: sb.auto
+    filter: sb.Private[dict | None] = None
+
+    @sb.field
+    async def total_count(self, exact: bool = False) -> int | None:
+        try:
+            return await repository.users.count(self.filter, exact)
+        except DatabaseUnavailable:
+            return None
+
+
+def user_info_from_document(document: dict) -> UserInfoType:
+    permission = document.get("permission")
+    return UserInfoType(
+        id=str(document["_id"]),
+        username=document["username"],
+        f_name=document.get("f_name"),
+        l_name=document.get("l_name"),
+        permission=UserPermission(permission) if permission else None,
+    )
+
+
+def user_list_from_documents(documents: list[dict]) -> UserListType:
+    return UserListType(
+        root=[user_info_from_document(document) for document in documents]
+    )
 
 
 UserListResult = Annotated[
@@ -111,9 +231,28 @@ class PermissionInput:
     permission: UserPermission
 
 
+@sb.input
+class UserFilterInput:
+    permission: UserPermission | None = None
+    usernames: list[str] | None = None
+
+
+@sb.type
+class AffectedUsers:
+    # Users changed or deleted, those already matching are not counted
+    affected: int
+
+
+AffectedUsersResult = Annotated[
+    AffectedUsers | ResultStatus,
+    sb.union("AffectedUsersResult"),
+]
+
+
 @sb.type
 class LoginSuccess:
     token: str
+    refresh_token: str | None = None
 
 
 LoginResult = Annotated[
@@ -123,6 +262,17 @@ LoginResult = Annotated[
 
 
 class Context(BaseContext):
+    def __init__(self) -> None:
+        super().__init__()
+        # (id, mod_date) of every document a query returned, for its ETag
+        self.cache_keys: list[tuple] = []
+        # Response keys of the fields that resolved to cacheable documents
+        self.cached_fields: set[str] = set()
+
+    def cacheable(self, info: sb.Info, keys) -> None:
+        self.cached_fields.add(info.path.key)
+        self.cache_keys.extend(keys)
+
     async def user(self) -> User | None:
         try:
             if not self.request:
@@ -134,6 +284,11 @@ class Context(BaseContext):
         except Exception:
             raise
 
+    def username(self) -> str | None:
+        if not self.request:
+            return None
+        return token_username(self.request.headers.get("Authorization", None))
+
 
 async def get_context() -> Context:
     return Context()
\ No newline at end of file
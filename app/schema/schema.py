@@ -1,11 +1,13 @@
 import strawberry as sb
 from strawberry.tools import merge_types
-from strawberry.fastapi import GraphQLRouter
 
+from app.config import settings
 from . import articles
 from . import books
 from . import users
 from . import depends
+from .caching import CachingGraphQLRouter, HttpCaching
+from .slowlog import SlowOperationLog
 
 Query = merge_types(
     "Query",
@@ -27,9 +29,18 @@ Subscription = merge_types(
     ()
 )
 """
-schema = sb.Schema(query=Query, mutation=Mutation,)# subscription=Subscription)
+extensions = [HttpCaching]
+if settings.SLOW_OPERATION_THRESHOLD is not None:
+    extensions.append(SlowOperationLog)
 
-graphql_app = GraphQLRouter(
+schema = sb.Schema(
+    query=Query,
+    mutation=Mutation,
+    extensions=extensions,
+)# subscription=Subscription)
+
+graphql_app = CachingGraphQLRouter(
     schema=schema,
     context_getter=depends.get_context,
+    allow_queries_via_get=True,
 )
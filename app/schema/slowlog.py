@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import logging
+import queue
+import random
+import time
+from contextvars import ContextVar
+from inspect import isawaitable
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+import orjson
+from graphql import NullValueNode, Visitor, print_ast, visit
+from strawberry.extensions import SchemaExtension
+
+from app.config import settings
+from app.database.db import client
+from app.database.monitoring import TrackedCommands, shape_of, tracked_commands
+
+EXPLAINABLE_COMMANDS = {
+    "find",
+    "aggregate",
+    "count",
+    "distinct",
+    "update",
+    "delete",
+    "findAndModify",
+}
+
+logger = logging.getLogger("app.slowlog")
+logger.propagate = False
+logger.setLevel(logging.INFO)
+
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+logger.addHandler(QueueHandler(_log_queue))
+
+_listener: QueueListener | None = None
+_background_tasks: set[asyncio.Task] = set()
+
+# Strawberry keeps the extension instance of the first operation as resolve
+# middleware, so resolver timings find their operation through the context
+_resolver_timings: ContextVar[list[dict] | None] = ContextVar(
+    "resolver_timings",
+    default=None,
+)
+
+
+def start_slow_log() -> None:
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = RotatingFileHandler(
+        settings.SLOW_OPERATION_LOG_FILE,
+        maxBytes=settings.SLOW_OPERATION_LOG_MAX_BYTES,
+        backupCount=settings.SLOW_OPERATION_LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+    _listener = QueueListener(_log_queue, handler)
+    _listener.start()
+
+
+async def stop_slow_log() -> None:
+    global _listener
+    if _background_tasks:
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class _StripLiterals(Visitor):
+    def enter_int_value(self, node, *args):
+        return NullValueNode()
+
+    enter_float_value = enter_int_value
+    enter_string_value = enter_int_value
+    enter_boolean_value = enter_int_value
+
+
+def document_hash(document) -> str | None:
+    if document is None:
+        return None
+
+    normalized = print_ast(visit(document, _StripLiterals()))
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def plan_stages(plan) -> list[str]:
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in plan_stages(item)]
+    if not isinstance(plan, dict):
+        return []
+
+    stages = [plan["stage"]] if "stage" in plan else []
+    for key, value in plan.items():
+        if key != "stage":
+            stages.extend(plan_stages(value))
+    return stages
+
+
+async def explain(command: dict) -> dict:
+    name = command["command"]
+    try:
+        result = await client[command["database"]].command(
+            {"explain": command["_command"], "verbosity": "queryPlanner"}
+        )
+        stages = plan_stages(result.get("queryPlanner", {}).get("winningPlan"))
+        return {
+            "command": name,
+            "collection": command["collection"],
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        }
+    except Exception as e:
+        return {"command": name, "collection": command["collection"], "error": str(e)}
+
+
+def write_record(record: dict) -> None:
+    logger.info(orjson.dumps(record).decode())
+
+
+async def write_explained_record(record: dict, commands: list[dict]) -> None:
+    record["explain"] = await asyncio.gather(*(
+        explain(command)
+        for command in commands
+        if command["command"] in EXPLAINABLE_COMMANDS
+    ))
+    write_record(record)
+
+
+class SlowOperationLog(SchemaExtension):
+    def on_operation(self):
+        self.resolvers: list[dict] = []
+        self.tracker = TrackedCommands()
+        token = tracked_commands.set(self.tracker)
+        timings_token = _resolver_timings.set(self.resolvers)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            _resolver_timings.reset(timings_token)
+            tracked_commands.reset(token)
+
+        duration = (time.perf_counter() - started) * 1000
+        if duration >= settings.SLOW_OPERATION_THRESHOLD:
+            self.report(duration)
+
+    def report(self, duration: float) -> None:
+        context = self.execution_context
+        commands = self.tracker.commands
+        record = {
+            "operation_name": context.operation_name,
+            "document_hash": document_hash(context.graphql_document),
+            "variables": shape_of(context.variables or {}),
+            "duration_ms": duration,
+            "resolvers": self.resolvers,
+            "mongo_commands": [
+                {key: value for key, value in command.items() if key != "_command"}
+                for command in commands
+            ],
+        }
+
+        if commands and random.random() < settings.SLOW_OPERATION_EXPLAIN_RATE:
+            try:
+                task = asyncio.get_running_loop().create_task(
+                    write_explained_record(record, commands)
+                )
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+                return
+            except RuntimeError:
+                pass
+        write_record(record)
+
+    def resolve(self, _next, root, info, *args, **kwargs):
+        result = _next(root, info, *args, **kwargs)
+        timings = _resolver_timings.get()
+        if timings is None or not isawaitable(result):
+            return result
+        return self.time_resolver(result, info, timings)
+
+    async def time_resolver(self, result, info, timings: list[dict]):
+        started = time.perf_counter()
+        try:
+            return await result
+        finally:
+            timings.append({
+                "path": ".".join(str(key) for key in info.path.as_list()),
+                "duration_ms": (time.perf_counter() - started) * 1000,
+            })
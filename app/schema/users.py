@@ -1,16 +1,20 @@
 
 import strawberry as sb
-import orjson
 from fastapi import status
 from pydantic import ValidationError
+from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
 
-from app.database.db import db
-from app.database.models import UserPermission, User, UserList
+from app.database import repository
+from app.database.audit import audit_log
+from app.database.breaker import DatabaseUnavailable
+from app.database.models import User, UserInfo, UserPermission
 from app.database.utils import (
     create_user,
     create_token,
-    find_one_or_404,
+    create_refresh_token,
+    rotate_refresh_token,
+    revoke_refresh_token,
     authenticate,
 )
 from .depends import (
@@ -19,15 +23,39 @@ from .depends import (
     UserInfoType,
     UserInfoResult,
     UserInfoInput,
-    UserListType,
     UserListResult,
     PermissionInput,
     LoginSuccess,
     LoginResult,
     Context,
+    UserFilterInput,
+    AffectedUsers,
+    AffectedUsersResult,
+    user_list_from_documents,
+    selects,
 )
 
 
+def users_filter(filter: UserFilterInput, admin: User) -> dict | None:
+    if filter.permission is None and filter.usernames is None:
+        return None
+
+    # Admins never change or delete their own account in bulk
+    users = {"username": {"$ne": admin.username}}
+    if filter.usernames is not None:
+        users["username"]["$in"] = filter.usernames
+    if filter.permission is not None:
+        users["permission"] = filter.permission.value
+    return users
+
+
+def filter_changes(filter: UserFilterInput) -> dict:
+    return {
+        "permission": filter.permission.value if filter.permission else None,
+        "usernames": filter.usernames,
+    }
+
+
 @sb.type
 class Mutation:
     @sb.field
@@ -40,15 +68,46 @@ class Mutation:
 
             token = await create_token(user)
             assert token is not None
-            return LoginSuccess(token=token)
+            return LoginSuccess(
+                token=token,
+                refresh_token=await create_refresh_token(user),
+            )
         except ValidationError:
             return ResultStatus(status_code=status.HTTP_400_BAD_REQUEST)
         except AssertionError:
             return ResultStatus(status_code=status.HTTP_401_UNAUTHORIZED)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
         except Exception:
             raise
 
 
+    @sb.field
+    async def refresh_token(self, token: str) -> LoginResult:
+        try:
+            rotated = await rotate_refresh_token(token)
+            assert rotated is not None
+            user, refresh_token = rotated
+
+            token = await create_token(user)
+            assert token is not None
+            return LoginSuccess(token=token, refresh_token=refresh_token)
+        except AssertionError:
+            return ResultStatus(status_code=status.HTTP_401_UNAUTHORIZED)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+    @sb.field
+    async def revoke_refresh_token(self, token: str) -> ResultStatus:
+        try:
+            if await revoke_refresh_token(token):
+                return ResultStatus(status_code=status.HTTP_204_NO_CONTENT)
+            return ResultStatus(status_code=status.HTTP_404_NOT_FOUND)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
     @sb.field
     async def check_auth(self, info: sb.Info[Context]) -> UserInfoResult:
         try:
@@ -57,6 +116,8 @@ class Mutation:
             return UserInfoType.from_pydantic(user)
         except AssertionError:
             return ResultStatus(status_code=status.HTTP_401_UNAUTHORIZED)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
         except Exception:
             raise
 
@@ -71,6 +132,8 @@ class Mutation:
             return ResultStatus(status_code=status.HTTP_400_BAD_REQUEST)
         except AssertionError:
             return ResultStatus(status_code=status.HTTP_409_CONFLICT)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 
     @sb.field
@@ -80,12 +143,19 @@ class Mutation:
             assert admin is not None
             assert admin.permission == UserPermission.admin  
 
-            users = UserList(root=await db["users"].find().to_list())
-            return UserListType.from_pydantic(users)
+            if not selects(info, "root"):
+                return user_list_from_documents([])
+
+            users = await repository.users.find(
+                projection=repository.users.info_projection
+            )
+            return user_list_from_documents(users)
         except ValidationError:
             return ResultStatus(status_code=status.HTTP_400_BAD_REQUEST)
         except AssertionError:
             return ResultStatus(status_code=status.HTTP_401_UNAUTHORIZED)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 
     @sb.field
@@ -100,28 +170,102 @@ class Mutation:
             assert admin is not None
             assert admin.permission == UserPermission.admin
 
-            user_filter = {"_id": ObjectId(id)}
-            user = await find_one_or_404(
-                filter=user_filter,
-                collection=db.get_collection("users"),
-                model=User,
+            user = await repository.users.update_info(
+                {"_id": ObjectId(id)},
+                {"permission": permission.permission.value},
             )
-            user.permission = permission.permission
-            result = await db["users"].update_one(
-                user_filter,
-                {"$set": orjson.loads(user.model_dump_json())}
-            )
-            if result.modified_count == 1:
+            if user is not None:
+                await audit_log.record(
+                    "change_permission",
+                    actor=admin.username,
+                    target=id,
+                    changes={"permission": permission.permission.value},
+                )
                 return UserInfoType.from_pydantic(user)
-            return ResultStatus(status_code=status.HTTP_409_CONFLICT)
+            return ResultStatus(status_code=status.HTTP_404_NOT_FOUND)
         except ValidationError:
             return ResultStatus(status_code=status.HTTP_400_BAD_REQUEST)
         except AssertionError:
             return ResultStatus(status_code=status.HTTP_401_UNAUTHORIZED)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
         except Exception:
             raise
 
 
+    @sb.field
+    async def set_permission_where(
+        self,
+        info: sb.Info[Context],
+        filter: UserFilterInput,
+        permission: UserPermission,
+    ) -> AffectedUsersResult:
+        try:
+            admin = await info.context.user()
+            assert admin is not None
+            assert admin.permission == UserPermission.admin
+
+            user_filter = users_filter(filter, admin)
+            if user_filter is None:
+                return ResultStatus(
+                    message="Empty filter.",
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                )
+
+            modified = await repository.users.set_permission_where(
+                user_filter, permission
+            )
+
+            await audit_log.record(
+                "set_permission_where",
+                actor=admin.username,
+                changes={
+                    **filter_changes(filter),
+                    "permission": permission.value,
+                    "modified": modified,
+                },
+            )
+            return AffectedUsers(affected=modified)
+        except AssertionError:
+            return ResultStatus(status_code=status.HTTP_401_UNAUTHORIZED)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+    @sb.field
+    async def delete_users_where(
+        self,
+        info: sb.Info[Context],
+        filter: UserFilterInput,
+    ) -> AffectedUsersResult:
+        try:
+            admin = await info.context.user()
+            assert admin is not None
+            assert admin.permission == UserPermission.admin
+
+            user_filter = users_filter(filter, admin)
+            if user_filter is None:
+                return ResultStatus(
+                    message="Empty filter.",
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                )
+
+            # Refresh tokens of deleted users find no user to rotate for and
+            # expire through the TTL index
+            deleted = await repository.users.delete_many(user_filter)
+
+            await audit_log.record(
+                "delete_users_where",
+                actor=admin.username,
+                changes={**filter_changes(filter), "deleted": deleted},
+            )
+            return AffectedUsers(affected=deleted)
+        except AssertionError:
+            return ResultStatus(status_code=status.HTTP_401_UNAUTHORIZED)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
     @sb.field
     async def update_info(
         self,
@@ -132,22 +276,40 @@ class Mutation:
             user = await info.context.user()
             assert user is not None
 
-            for key, value in input.to_pydantic().model_dump().items():
-                print(key, value)
-                if key is "id": continue
-                setattr(user, key, value)
-
-            obj = orjson.loads(user.model_dump_json())
-            obj.pop("permission")
-
-            result = await db["users"].update_one(
+            provided = input.provided()
+            if not provided:
+                return ResultStatus(
+                    message="Nothing to update.",
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                )
+            if "username" in provided and provided["username"] is None:
+                return ResultStatus(
+                    message="Username cannot be null.",
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                )
+            info_fields = UserInfo(
+                **{"username": user.username, **provided}
+            ).model_dump(include=set(provided))
+            updated = await repository.users.update_info(
                 {"username": user.username},
-                {"$set": obj},
+                info_fields,
             )
-            if result.modified_count == 1:
-                return UserInfoType.from_pydantic(user)
-            return ResultStatus(status_code=status.HTTP_409_CONFLICT) 
+            if updated is not None:
+                await audit_log.record(
+                    "update_info",
+                    actor=user.username,
+                    target=str(updated.id),
+                    changes=info_fields,
+                )
+                return UserInfoType.from_pydantic(updated)
+            return ResultStatus(status_code=status.HTTP_409_CONFLICT)
         except ValidationError as e:
-            return ResultStatus(status_code=status.HTTP_400_BAD_REQUEST, message=e)
+            return ResultStatus(
+                message="Invalid fields.",
+                status_code=status.HTTP_400_BAD_REQUEST)
+        except DuplicateKeyError:
+            return ResultStatus(status_code=status.HTTP_409_CONFLICT)
         except AssertionError:
-            return ResultStatus(status_code=status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+            return ResultStatus(status_code=status.HTTP_401_UNAUTHORIZED)
+        except DatabaseUnavailable:
+            return ResultStatus(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
\ No newline at end of file
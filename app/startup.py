@@ -0,0 +1,26 @@
+import logging
+import time
+from contextlib import contextmanager
+
+# Shows up in the server log next to the startup lines of uvicorn
+logger = logging.getLogger("uvicorn.error")
+
+# Milliseconds by phase, in the order they ran
+phases: dict[str, float] = {}
+
+
+@contextmanager
+def phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = (time.perf_counter() - started) * 1000
+
+
+def report() -> None:
+    logger.info(
+        "Startup took %.1f ms (%s)",
+        sum(phases.values()),
+        ", ".join(f"{name} {ms:.1f} ms" for name, ms in phases.items()),
+    )
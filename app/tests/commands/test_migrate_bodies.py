@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from app.tests.utils import get_client
+from app.commands.migrate_bodies import migrate
+from app.config import settings
+from app.database import repository
+from app.database.db import db
+
+
+@pytest.mark.asyncio
+async def test_migrate_bodies(client: TestClient, monkeypatch):
+    await db["articles"].insert_many([
+        {
+            "title": f"title{i}",
+            "author": "author",
+            "pub_date": datetime(2025, 1, 1).isoformat(),
+            "mod_date": datetime(2025, 1, 1).isoformat(),
+            "body": "x" * (i * 20),
+        }
+        for i in range(4)
+    ])
+    # Left behind by a failed insert long ago
+    orphan = str(ObjectId.from_datetime(datetime.now() - timedelta(days=1)))
+    await db["article_bodies"].insert_one(
+        {"body_id": orphan, "offset": 0, "end": 1, "data": b""}
+    )
+
+    monkeypatch.setattr(settings, "BODY_EXTERNAL_THRESHOLD", 30)
+    monkeypatch.setattr(settings, "BODY_CHUNK_SIZE", 16)
+    result = await migrate(batch_size=2, remove_orphans=True)
+    assert result == {"moved": 2, "changed": 0, "removed": 1}
+
+    async for article in db["articles"].find({}):
+        length = int(article["title"][-1]) * 20
+        if length > 30:
+            assert article["body"] is None
+            assert article["body_size"] == length
+            assert await repository.article_bodies.read(article["body_id"]) == "x" * length
+        else:
+            assert article["body"] == "x" * length
+            assert article.get("body_id") is None
+
+    assert not await db["article_bodies"].count_documents({"body_id": orphan})
+    assert await migrate() == {"moved": 0, "changed": 0, "removed": 0}
@@ -0,0 +1,45 @@
+import bcrypt
+import pytest
+from fastapi.testclient import TestClient
+
+from app.tests.utils import get_client
+from app.commands.seed import Generator, seed
+from app.config import settings
+from app.database.db import db
+from app.database.models import Article, User
+
+
+def test_generator_is_deterministic():
+    first, second = Generator(7, 50, "hash"), Generator(7, 50, "hash")
+
+    users = [first.user(number) for number in range(50)]
+    assert users == [second.user(number) for number in range(50)]
+    articles = [first.article(number) for number in range(200)]
+    assert articles == [second.article(number) for number in range(200)]
+
+    assert len({article["title"] for article in articles}) == len(articles)
+    for article in articles:
+        Article(**{key: value for key, value in article.items() if key != "_id"})
+
+
+@pytest.mark.asyncio
+async def test_seed(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+
+    result = await seed(users=20, articles=300, batch_size=64, concurrency=3)
+    assert result["users"]["inserted"] == 20
+    assert result["articles"]["inserted"] == 300
+
+    result = await seed(users=20, articles=300, batch_size=64, concurrency=3)
+    assert result["articles"]["inserted"] == 0
+    assert result["articles"]["skipped"] == 300
+
+    user = await db["users"].find_one({"username": "user0000000"})
+    User(**{key: value for key, value in user.items() if key != "_id"})
+
+    # The shared password hash is seeded as well
+    await db["users"].delete_many({})
+    await seed(users=20, articles=0, batch_size=64, concurrency=3)
+    reseeded = await db["users"].find_one({"username": "user0000000"})
+    assert reseeded == user
+    assert bcrypt.checkpw(b"password123", reseeded["passwd_hash"].encode())
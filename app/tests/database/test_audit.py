@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.tests.utils import get_client
+from app.database.audit import AuditLog
+from app.database.db import db
+
+
+async def actions() -> list[str]:
+    return [event["action"] async for event in db["audit_events"].find({})]
+
+
+@pytest.mark.asyncio
+async def test_audit_log_batches(client: TestClient):
+    audit_log = AuditLog(
+        queue_size=100,
+        batch_size=3,
+        flush_interval=0.05,
+        overflow="block",
+    )
+    audit_log.start()
+
+    for i in range(4):
+        await audit_log.record(f"action{i}")
+    await asyncio.sleep(0.01)
+    # A full batch is written right away, the rest waits for the interval
+    assert await actions() == ["action0", "action1", "action2"]
+
+    await asyncio.sleep(0.1)
+    assert await actions() == ["action0", "action1", "action2", "action3"]
+
+    await audit_log.record("action4")
+    await audit_log.stop()
+    assert len(await actions()) == 5
+    assert audit_log.snapshot() == {"queued": 0, "written": 5, "dropped": 0, "failed": 0}
+
+
+@pytest.mark.asyncio
+async def test_audit_log_overflow(client: TestClient):
+    audit_log = AuditLog(queue_size=2, batch_size=10, flush_interval=1, overflow="drop")
+    audit_log.start()
+
+    # The flusher gets no chance to run in between
+    for i in range(5):
+        await audit_log.record(f"action{i}")
+    assert audit_log.dropped == 3
+
+    await audit_log.stop()
+    assert await actions() == ["action0", "action1"]
+
+    audit_log = AuditLog(queue_size=2, batch_size=10, flush_interval=1, overflow="block")
+    audit_log.start()
+    await asyncio.wait_for(
+        asyncio.gather(*(audit_log.record(f"blocked{i}") for i in range(5))),
+        timeout=1,
+    )
+    await audit_log.stop()
+    assert audit_log.snapshot()["written"] == 5
+    assert audit_log.dropped == 0
@@ -0,0 +1,106 @@
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from pymongo.errors import NetworkTimeout
+
+from app.tests.utils import BASE_URL, get_client
+from app.database.breaker import (
+    BreakerState,
+    CircuitBreaker,
+    DatabaseUnavailable,
+    breaker,
+    guarded,
+)
+from app.database.models import User
+from app.database.utils import create_token
+
+
+def make_breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        window=4,
+        min_calls=4,
+        error_rate=0.5,
+        slow_call_time=100,
+        slow_call_rate=0.75,
+        reset_time=0,
+    )
+
+
+def test_circuit_breaker():
+    circuit = make_breaker()
+    for failed in (False, True, False):
+        circuit.record(1, failed)
+    assert circuit.state is BreakerState.closed
+
+    circuit.record(1, True)
+    assert circuit.state is BreakerState.open
+
+    # reset_time is 0, so the next call probes the database alone
+    assert circuit.allow()
+    assert circuit.state is BreakerState.half_open
+    assert not circuit.allow()
+
+    circuit.record(1, False)
+    assert circuit.state is BreakerState.closed
+
+    for _ in range(4):
+        circuit.record(500, False)
+    assert circuit.state is BreakerState.open
+
+
+def test_guarded(monkeypatch):
+    circuit = make_breaker()
+    monkeypatch.setattr("app.database.breaker.breaker", circuit)
+
+    for _ in range(2):
+        with pytest.raises(DatabaseUnavailable):
+            with guarded(100):
+                raise NetworkTimeout("timed out")
+    for _ in range(2):
+        with guarded(100):
+            pass
+    assert circuit.state is BreakerState.open
+
+    circuit.reset_time = 60
+    with pytest.raises(DatabaseUnavailable):
+        with guarded(100):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_breaker_open(client: TestClient, monkeypatch):
+    response = client.get("/ready")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["breaker"]["state"] == "closed"
+
+    monkeypatch.setattr(breaker, "state", BreakerState.open)
+    monkeypatch.setattr(breaker, "opened_at", float("inf"))
+
+    response = client.get("/ready")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    response = client.post(
+        BASE_URL,
+        json={"query": '{ article(id: "%s") { ... on ResultStatus { statusCode } } }'
+            % ("0" * 24)}
+    )
+    assert response.json()["data"]["article"]["statusCode"] == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    response = client.post(
+        BASE_URL,
+        json={"query": 'mutation { deleteArticle(id: "%s") { statusCode } }' % ("0" * 24)}
+    )
+    assert response.json()["data"]["deleteArticle"]["statusCode"] == (
+        status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+    token = await create_token(User(username="testuser", passwd_hash=b"hash"))
+    response = client.post(
+        BASE_URL,
+        json={"query": 'mutation { updateInfo(input: {fName: "First"}) '
+            '{ ... on ResultStatus { statusCode } } }'},
+        headers={"Authorization": token},
+    )
+    assert response.json()["data"]["updateInfo"]["statusCode"] == (
+        status.HTTP_503_SERVICE_UNAVAILABLE
+    )
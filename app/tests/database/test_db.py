@@ -0,0 +1,39 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.tests.utils import get_client
+from app.database.db import base_models, create_schema, db, run_db_setup
+
+
+@pytest.mark.asyncio
+async def test_run_db_setup_keeps_foreign_indexes(client: TestClient):
+    articles = db.get_collection("articles")
+    await articles.create_index(
+        [("pub_date", 1), ("mod_date", 1), ("author", 1)]
+    )
+    await articles.create_index([("summary", 1)], name="added_by_hand")
+
+    await run_db_setup()
+    indexes = await articles.index_information()
+    assert "pub_date_1_mod_date_1_author_1" not in indexes
+    assert "added_by_hand" in indexes
+    assert "author_1_pub_date_-1" in indexes
+
+
+def schema_keywords(schema) -> set[str]:
+    if isinstance(schema, list):
+        return set().union(*map(schema_keywords, schema))
+    if not isinstance(schema, dict):
+        return set()
+    keywords = set(schema)
+    if schema.get("type") == "integer":
+        keywords.add("integer")
+    return keywords.union(*map(schema_keywords, schema.values()))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", list(base_models))
+async def test_validators_use_mongodb_keywords(name: str):
+    # The memory backend ignores collMod, a real server rejects these
+    schema, _ = await create_schema(name, base_models[name])
+    assert not schema_keywords(schema["validator"]) & {"integer", "format", "$ref"}
@@ -0,0 +1,47 @@
+import pytest
+import pytest_asyncio
+from pymongo import IndexModel
+from pymongo.errors import DuplicateKeyError
+
+from app.database.memory import MemoryClient
+
+
+@pytest_asyncio.fixture(name="users")
+async def get_users():
+    users = MemoryClient().get_database("test_database").get_collection("users")
+    await users.create_indexes([IndexModel([("username", 1)], unique=True)])
+    return users
+
+
+@pytest.mark.asyncio
+async def test_unique_index(users):
+    await users.insert_one({"username": "testuser", "permission": "guest"})
+    with pytest.raises(DuplicateKeyError):
+        await users.insert_one({"username": "testuser", "permission": "admin"})
+
+    other = await users.insert_one({"username": "testuser2"})
+    with pytest.raises(DuplicateKeyError):
+        await users.update_one(
+            {"_id": other.inserted_id},
+            {"$set": {"username": "testuser"}},
+        )
+
+    assert await users.count_documents({}) == 2
+    assert await users.find_one({"username": "testuser2"}) is not None
+    assert (await users.find_one({"username": "testuser"}))["permission"] == "guest"
+
+
+@pytest.mark.asyncio
+async def test_find(users):
+    await users.insert_many([
+        {"username": f"user{i}", "age": i, "passwd_hash": "x"} for i in range(10)
+    ])
+
+    found = await users.find(
+        {"age": {"$gte": 3, "$lt": 7}},
+        {"passwd_hash": 0},
+    ).sort("age", -1).limit(2).to_list()
+
+    assert [user["age"] for user in found] == [6, 5]
+    assert all("passwd_hash" not in user for user in found)
+    assert users._candidates({"username": "user4"})[0]["age"] == 4
@@ -0,0 +1,384 @@
+import time
+from dataclasses import asdict
+from datetime import datetime
+from itertools import product
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from pymongo import AsyncMongoClient
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.tests.utils import BASE_URL, get_client
+from app.database import repository
+from app.database.breaker import DatabaseUnavailable
+from app.database.db import db
+from app.config import settings
+from app.database.models import Article, ArticleList
+from app.schema.slowlog import plan_stages
+from app.schema.depends import ArticleListType, article_list_from_documents
+
+create_article_mutation = """
+    mutation {
+      createArticle(input: {title: "%s", author: "%s", body: "%s"}) {
+        ... on ArticleType {
+          title
+          modDate
+        }
+        ... on ResultStatus {
+          message
+          statusCode
+        }
+      }
+    }
+"""
+
+update_article_mutation = """
+    mutation {
+      updateArticle(
+        id: "%s",
+        input: {title: "%s", author: "%s", body: "%s"},
+        expectedModDate: "%s",
+      ) {
+        ... on ArticleType {
+          title
+          body
+          pubDate
+          modDate
+        }
+        ... on ResultStatus {
+          message
+          statusCode
+        }
+      }
+    }
+"""
+
+
+@pytest.mark.asyncio
+async def test_update_article(client: TestClient):
+    response = client.post(
+        BASE_URL,
+        json={"query": create_article_mutation % ("title", "author", "body")}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    created = response.json()["data"]["createArticle"]
+
+    article = await db["articles"].find_one({"title": "title"})
+    assert article is not None
+
+    response = client.post(
+        BASE_URL,
+        json={"query": update_article_mutation % (
+            article["_id"], "title", "author", "new body", created["modDate"],
+        )}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    updated = response.json()["data"]["updateArticle"]
+    assert updated["body"] == "new body"
+    assert updated["modDate"] != created["modDate"]
+
+    stored = await db["articles"].find_one({"_id": article["_id"]})
+    assert stored["pub_date"] == article["pub_date"]
+
+    response = client.post(
+        BASE_URL,
+        json={"query": update_article_mutation % (
+            article["_id"], "title", "author", "stale body", created["modDate"],
+        )}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["data"]["updateArticle"]["statusCode"] == status.HTTP_409_CONFLICT
+
+
+@pytest.mark.asyncio
+async def test_articles_list(client: TestClient):
+    articles_list_query = """
+        query {
+          articlesList {
+            ... on ArticleListType {
+              root {
+                _id
+                title
+                author
+                pubDate
+                modDate
+              }
+            }
+            ... on ResultStatus {
+              statusCode
+            }
+          }
+        }
+    """
+    for i in range(3):
+        client.post(
+            BASE_URL,
+            json={"query": create_article_mutation % (f"title{i}", "author", "body")}
+        )
+
+    documents = await db["articles"].find(
+        {}, {"_id": 1, "title": 1, "author": 1, "pub_date": 1, "mod_date": 1}
+    ).to_list()
+    fast = article_list_from_documents(documents)
+    validated = ArticleListType.from_pydantic(ArticleList(root=documents))
+    for article, expected in zip(fast.root, validated.root, strict=True):
+        assert asdict(article) == {**asdict(expected), "id": str(expected.id)}
+
+    response = client.post(BASE_URL, json={"query": articles_list_query})
+    assert response.status_code == status.HTTP_200_OK
+    root = response.json()["data"]["articlesList"]["root"]
+    assert [article["title"] for article in root] == ["title0", "title1", "title2"]
+    assert root[0]["_id"] == str(documents[0]["_id"])
+
+
+@pytest.mark.asyncio
+async def test_articles_filters(client: TestClient, monkeypatch):
+    articles_query = """
+        query {
+          articles(%s) {
+            ... on ArticleListType {
+              root {
+                title
+              }
+            }
+          }
+        }
+    """
+    await db["articles"].insert_many([
+        {
+            "title": f"title{i}",
+            "author": "author" if i % 2 else "writer",
+            "pub_date": datetime(2025, 1, i + 1).isoformat(),
+            "mod_date": datetime(2025, 1, i + 1).isoformat(),
+        }
+        for i in range(6)
+    ])
+
+    def titles(arguments: str) -> list[str]:
+        response = client.post(BASE_URL, json={"query": articles_query % arguments})
+        assert response.status_code == status.HTTP_200_OK
+        return [article["title"] for article in response.json()["data"]["articles"]["root"]]
+
+    assert titles('author: "author"') == ["title5", "title3", "title1"]
+    assert titles('author: "author", sort: oldest') == ["title1", "title3", "title5"]
+    assert titles(
+        'publishedAfter: "2025-01-02T00:00:00", publishedBefore: "2025-01-05T00:00:00"'
+    ) == ["title3", "title2", "title1"]
+    assert titles(
+        'author: "writer", publishedAfter: "2025-01-02T00:00:00", sort: oldest'
+    ) == ["title2", "title4"]
+
+    # Aware bounds are compared as the naive local time dates are stored in
+    monkeypatch.setenv("TZ", "Asia/Tehran")
+    time.tzset()
+    try:
+        assert titles(
+            'publishedAfter: "2025-01-01T20:30:00Z", '
+            'publishedBefore: "2025-01-04T00:00:00+03:30"'
+        ) == ["title2", "title1"]
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+async def assert_index_scans(articles: repository.ArticleRepository) -> None:
+    date = datetime(2025, 1, 1)
+    for author, published_after, published_before, newest_first in product(
+        (None, "author"),
+        (None, date),
+        (None, date),
+        (True, False),
+    ):
+        plan = await articles.query(
+            author=author,
+            published_after=published_after,
+            published_before=published_before,
+            newest_first=newest_first,
+        ).explain()
+        stages = plan_stages(plan["queryPlanner"]["winningPlan"])
+        assert "IXSCAN" in stages
+        assert "COLLSCAN" not in stages
+
+
+@pytest.mark.asyncio
+async def test_articles_query_plans(client: TestClient):
+    # Smoke test only, this explains with the planner of the memory backend
+    await assert_index_scans(repository.articles)
+
+
+@pytest.mark.asyncio
+async def test_articles_query_plans_mongo():
+    mongo = AsyncMongoClient(str(settings.mongo_dsn), serverSelectionTimeoutMS=500)
+    try:
+        await mongo.admin.command("ping")
+    except PyMongoError:
+        await mongo.close()
+        pytest.skip("No MongoDB server is reachable.")
+
+    database = mongo.get_database("test_query_plans")
+    try:
+        await mongo.drop_database(database.name)
+        collection = database.get_collection("articles")
+        await collection.create_indexes(Article.model_json_schema()["indexes"])
+        await collection.insert_many([
+            {
+                "title": f"title{i}",
+                "author": f"author{i % 50}",
+                "pub_date": datetime(2024, 1 + i % 12, 1 + i % 28).isoformat(),
+                "mod_date": datetime(2024, 1 + i % 12, 1 + i % 28).isoformat(),
+            }
+            for i in range(1000)
+        ])
+
+        await assert_index_scans(repository.ArticleRepository(
+            database, repository.ArticleBodyRepository(database)
+        ))
+    finally:
+        await mongo.drop_database(database.name)
+        await mongo.close()
+
+
+@pytest.mark.asyncio
+async def test_articles_total_count(client: TestClient, monkeypatch):
+    total_count_query = """
+        query {
+          articlesList {
+            ... on ArticleListType {
+              totalCount
+            }
+          }
+          articles(author: "author") {
+            ... on ArticleListType {
+              totalCount
+              exact: totalCount(exact: true)
+            }
+          }
+        }
+    """
+
+    async def insert(start: int, stop: int) -> None:
+        await db["articles"].insert_many([
+            {
+                "title": f"title{i}",
+                "author": "author" if i % 2 else "writer",
+                "pub_date": datetime(2025, 1, i + 1).isoformat(),
+                "mod_date": datetime(2025, 1, i + 1).isoformat(),
+            }
+            for i in range(start, stop)
+        ])
+
+    def counts() -> tuple[int, int, int]:
+        response = client.post(BASE_URL, json={"query": total_count_query})
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()["data"]
+        return (
+            data["articlesList"]["totalCount"],
+            data["articles"]["totalCount"],
+            data["articles"]["exact"],
+        )
+
+    repository.articles.counts.clear()
+    await insert(0, 4)
+    assert counts() == (4, 2, 2)
+
+    # The filtered count is served from the cache until it expires
+    await insert(4, 6)
+    assert counts() == (6, 2, 3)
+
+    repository.articles.counts.clear()
+    assert counts() == (6, 3, 3)
+
+    # Counting alone never loads the list
+    async def fail(*args, **kwargs):
+        raise AssertionError("list was loaded")
+
+    monkeypatch.setattr(repository.articles, "find", fail)
+    monkeypatch.setattr(repository.articles, "fetch", fail)
+    assert counts() == (6, 3, 3)
+    monkeypatch.undo()
+
+    async def unavailable(*args, **kwargs):
+        raise DatabaseUnavailable
+
+    monkeypatch.setattr(repository.articles, "count", unavailable)
+    response = client.post(BASE_URL, json={"query": """
+        query {
+          articlesList {
+            ... on ArticleListType {
+              totalCount
+              root { title }
+            }
+          }
+        }
+    """})
+    data = response.json()["data"]["articlesList"]
+    assert data["totalCount"] is None
+    assert len(data["root"]) == 6
+
+
+@pytest.mark.asyncio
+async def test_large_article_body(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "BODY_EXTERNAL_THRESHOLD", 32)
+    monkeypatch.setattr(settings, "BODY_CHUNK_SIZE", 16)
+    body_query = """
+        query {
+          article(id: "%s") {
+            ... on ArticleType {
+              body
+              bodySize
+              bodySlice(offset: 20, length: 30)
+            }
+          }
+        }
+    """
+    body = "".join(f"{i:03d}" for i in range(40))
+
+    response = client.post(
+        BASE_URL,
+        json={"query": create_article_mutation % ("title", "author", body)}
+    )
+    created = response.json()["data"]["createArticle"]
+    article = await db["articles"].find_one({"title": "title"})
+    assert article["body"] is None
+    assert article["body_size"] == len(body)
+    assert await db["article_bodies"].count_documents(
+        {"body_id": article["body_id"]}
+    ) == 8
+
+    response = client.post(BASE_URL, json={"query": body_query % article["_id"]})
+    assert response.json()["data"]["article"] == {
+        "body": body,
+        "bodySize": len(body),
+        "bodySlice": body[20:50],
+    }
+
+    response = client.post(
+        BASE_URL,
+        json={"query": update_article_mutation % (
+            article["_id"], "title", "author", "short body", created["modDate"],
+        )}
+    )
+    assert response.json()["data"]["updateArticle"]["body"] == "short body"
+    stored = await db["articles"].find_one({"_id": article["_id"]})
+    assert stored["body"] == "short body"
+    assert stored["body_id"] is None
+    assert await db["article_bodies"].count_documents({}) == 0
+
+    response = client.post(BASE_URL, json={"query": body_query % article["_id"]})
+    assert response.json()["data"]["article"]["bodySlice"] == ""
+
+    async def duplicate(*args, **kwargs):
+        raise DuplicateKeyError("title")
+
+    monkeypatch.setattr(
+        repository.articles.collection, "find_one_and_update", duplicate
+    )
+    response = client.post(
+        BASE_URL,
+        json={"query": update_article_mutation % (
+            article["_id"], "title", "author", body, stored["mod_date"],
+        )}
+    )
+    assert response.json()["data"]["updateArticle"]["statusCode"] == 409
+    assert await db["article_bodies"].count_documents({}) == 0
@@ -0,0 +1,84 @@
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.tests.utils import BASE_URL, get_client
+from app.database.breaker import BreakerState, breaker
+from app.database.db import db
+from app.schema.caching import cache_policy, max_age
+from .test_articles import create_article_mutation, update_article_mutation
+
+article_query = """
+    query {
+      article(id: "%s") {
+        ... on ArticleType {
+          title
+          body
+        }
+      }
+    }
+"""
+
+
+def test_cache_policy():
+    assert max_age("public, max-age=60") == 60
+    assert max_age("no-store") == 0
+    assert cache_policy(["article"]) == "public, max-age=60"
+    assert cache_policy(["article", "articlesList"]) == "public, max-age=10"
+    assert cache_policy(["article", "__typename"]) is None
+    assert cache_policy([]) is None
+
+
+@pytest.mark.asyncio
+async def test_conditional_get(client: TestClient):
+    response = client.post(
+        BASE_URL,
+        json={"query": create_article_mutation % ("title", "author", "body")}
+    )
+    created = response.json()["data"]["createArticle"]
+    assert "etag" not in response.headers
+    article = await db["articles"].find_one({"title": "title"})
+
+    query = {"query": article_query % article["_id"]}
+    response = client.get(BASE_URL, params=query)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["data"]["article"]["body"] == "body"
+    assert response.headers["cache-control"] == "public, max-age=60"
+    etag = response.headers["etag"]
+
+    response = client.get(BASE_URL, params=query, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    client.post(
+        BASE_URL,
+        json={"query": update_article_mutation % (
+            article["_id"], "title", "author", "new body", created["modDate"],
+        )}
+    )
+    response = client.get(BASE_URL, params=query, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["data"]["article"]["body"] == "new body"
+    assert response.headers["etag"] != etag
+
+
+def test_result_status_not_cached(client: TestClient, monkeypatch):
+    query = {"query": article_query % ("0" * 24)}
+    response = client.get(BASE_URL, params=query)
+    assert response.status_code == status.HTTP_200_OK
+    assert "etag" not in response.headers
+    assert "cache-control" not in response.headers
+
+    monkeypatch.setattr(breaker, "state", BreakerState.open)
+    monkeypatch.setattr(breaker, "opened_at", float("inf"))
+    response = client.get(BASE_URL, params={
+        "query": """{ articlesList {
+            ... on ArticleListType { root { title } }
+            ... on ResultStatus { statusCode }
+        } }"""
+    })
+    assert response.json()["data"]["articlesList"]["statusCode"] == (
+        status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+    assert "cache-control" not in response.headers
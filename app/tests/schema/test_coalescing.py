@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from app.database import repository
+from app.schema.schema import schema
+from app.schema.coalescing import SingleFlight, reads
+from app.schema.depends import Context
+
+
+@pytest.mark.asyncio
+async def test_single_flight():
+    flight = SingleFlight()
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    assert await asyncio.gather(*(flight.do("key", call) for _ in range(5))) == [1] * 5
+    assert flight.snapshot() == {"in_flight": 0, "executed": 1, "coalesced": 4}
+
+    # Finished calls are not cached
+    assert await flight.do("key", call) == 2
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError
+
+    results = await asyncio.gather(
+        *(flight.do("fail", fail) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.snapshot()["coalesced"] == 6
+
+    # Cancelling one caller leaves the shared call running for the others
+    first = asyncio.create_task(flight.do("key", call))
+    second = asyncio.create_task(flight.do("key", call))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == 3
+
+
+@pytest.mark.asyncio
+async def test_articles_list_coalescing(monkeypatch):
+    calls = 0
+
+    async def find(filter=None, projection=None):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return []
+
+    monkeypatch.setattr(repository.articles, "find", find)
+    coalesced = reads.coalesced
+
+    query = "{ articlesList { ... on ArticleListType { root { title } } } }"
+    results = await asyncio.gather(*(
+        schema.execute(query, context_value=Context()) for _ in range(10)
+    ))
+    assert all(result.errors is None for result in results)
+    assert calls == 1
+    assert reads.coalesced - coalesced == 9
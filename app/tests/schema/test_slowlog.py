@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+
+import orjson
+import pytest
+import strawberry as sb
+from graphql import parse
+
+from app.config import settings
+from app.database.monitoring import CommandTracker, shape_of
+from app.schema.slowlog import (
+    SlowOperationLog,
+    document_hash,
+    plan_stages,
+    start_slow_log,
+    stop_slow_log,
+)
+
+
+def test_document_hash():
+    first = document_hash(parse('query { article(id: "1") { title } }'))
+    second = document_hash(parse('query {\n  article(id: "2") {\n title } }'))
+    other = document_hash(parse('query { article(id: "1") { author } }'))
+
+    assert first == second
+    assert first != other
+
+
+def test_shape_of():
+    assert shape_of({"id": "secret", "input": {"tags": [1, 2], "body": None}}) == {
+        "id": "str",
+        "input": {"tags": ["int"], "body": None},
+    }
+
+
+def test_plan_stages():
+    plan = {
+        "stage": "FETCH",
+        "inputStage": {"stage": "IXSCAN", "indexName": "title_1"},
+    }
+    assert plan_stages(plan) == ["FETCH", "IXSCAN"]
+    assert "COLLSCAN" not in plan_stages(plan)
+
+
+@pytest.mark.asyncio
+async def test_slow_operation_log(tmp_path, monkeypatch):
+    log_file = tmp_path / "slow.log"
+    monkeypatch.setattr(settings, "SLOW_OPERATION_LOG_FILE", str(log_file))
+    monkeypatch.setattr(settings, "SLOW_OPERATION_EXPLAIN_RATE", 0)
+
+    @sb.type
+    class Query:
+        @sb.field
+        async def article(self, id: str) -> str:
+            # What the driver reports for a find on the Mongo backend
+            tracker = CommandTracker()
+            event = SimpleNamespace(
+                command_name="find",
+                command={"find": "articles", "filter": {"title": id}, "lsid": {}},
+                database_name="test_database",
+                request_id=1,
+            )
+            tracker.started(event)
+            await asyncio.sleep(0.01)
+            tracker.succeeded(event)
+            return id
+
+    schema = sb.Schema(query=Query, extensions=[SlowOperationLog])
+    query = 'query Article($id: String!) { article(id: $id) }'
+
+    start_slow_log()
+    monkeypatch.setattr(settings, "SLOW_OPERATION_THRESHOLD", 10_000)
+    assert (await schema.execute(query, variable_values={"id": "fast"})).errors is None
+    monkeypatch.setattr(settings, "SLOW_OPERATION_THRESHOLD", 0)
+    assert (await schema.execute(query, variable_values={"id": "secret"})).errors is None
+    await stop_slow_log()
+
+    records = [orjson.loads(line) for line in log_file.read_text().splitlines()]
+    assert len(records) == 1
+    record = records[0]
+    assert record["operation_name"] == "Article"
+    assert record["document_hash"] == document_hash(parse(query))
+    assert record["variables"] == {"id": "str"}
+    assert [resolver["path"] for resolver in record["resolvers"]] == ["article"]
+    assert record["resolvers"][0]["duration_ms"] >= 10
+    assert record["duration_ms"] >= record["resolvers"][0]["duration_ms"]
+
+    command, = record["mongo_commands"]
+    assert command["command"] == "find"
+    assert command["collection"] == "articles"
+    assert command["shape"] == {"filter": {"title": "str"}}
+    assert command["failed"] is False
+    assert "secret" not in log_file.read_text()
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
@@ -5,7 +7,17 @@ from fastapi.testclient import TestClient
 from app.tests.utils import BASE_URL, get_client, get_user
 from app.database.db import db
 from app.database.models import User, UserLogin, UserPermission
-from app.database.utils import create_user, auth_token, create_token, authenticate
+from app.config import settings
+from app.database.utils import (
+    create_user,
+    auth_token,
+    create_token,
+    create_refresh_token,
+    rotate_refresh_token,
+    authenticate,
+    background_tasks,
+    hash_cost,
+)
 
 
 @pytest.mark.asyncio
@@ -183,4 +195,213 @@ async def test_change_permission(client: TestClient, user: User):
         headers={"Authorization": token}
     )
     assert response.status_code == status.HTTP_200_OK
-    assert response.json()["data"]["changePermission"]["permission"] == UserPermission.staff.value
\ No newline at end of file
+    assert response.json()["data"]["changePermission"]["permission"] == UserPermission.staff.value
+
+@pytest.mark.asyncio
+async def test_update_info(client: TestClient, user: User):
+    update_info_mutation = """
+        mutation {
+          updateInfo(input: {username: "%s", fName: "%s"}) {
+            ... on UserInfoType {
+              fName
+              lName
+              permission
+              username
+            }
+            ... on ResultStatus {
+              message
+              statusCode
+            }
+          }
+        }
+    """
+    token = await create_token(user)
+    assert token is not None
+    await db["users"].update_one({"username": user.username}, {"$set": {"l_name": "Last"}})
+
+    response = client.post(
+        BASE_URL,
+        json={"query": update_info_mutation % (user.username, "Test")},
+        headers={"Authorization": token}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()["data"]["updateInfo"]
+    assert result["fName"] == "Test"
+    assert result["permission"] == user.permission.value
+
+    stored = await db["users"].find_one({"username": user.username})
+    assert stored["f_name"] == "Test"
+    # Fields left out of the input are not touched
+    assert stored["l_name"] == "Last"
+    assert stored["passwd_hash"] == user.passwd_hash.decode()
+
+    event = await db["audit_events"].find_one({"action": "update_info"})
+    assert event["actor"] == user.username
+    assert event["target"] == str(stored["_id"])
+    assert event["changes"] == {"username": user.username, "f_name": "Test"}
+
+    for input in ("{username: null}", '{username: "x"}'):
+        response = client.post(
+            BASE_URL,
+            json={"query": """
+                mutation {
+                  updateInfo(input: %s) {
+                    ... on ResultStatus { message statusCode }
+                  }
+                }
+            """ % input},
+            headers={"Authorization": token}
+        )
+        body = response.json()
+        assert "errors" not in body
+        assert body["data"]["updateInfo"]["statusCode"] == status.HTTP_400_BAD_REQUEST
+        assert body["data"]["updateInfo"]["message"]
+
+
+@pytest.mark.asyncio
+async def test_authenticate_rehash(client: TestClient, user: User, monkeypatch):
+    assert hash_cost(user.passwd_hash) == settings.BCRYPT_ROUNDS
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+
+    login = UserLogin(username="testuser", password="123123123")
+    assert await authenticate(login) == user
+    await asyncio.gather(*background_tasks)
+
+    rehashed = await authenticate(login)
+    assert rehashed is not None
+    assert hash_cost(rehashed.passwd_hash) == 4
+    assert not background_tasks
+
+
+@pytest.mark.asyncio
+async def test_refresh_token(client: TestClient, user: User):
+    login_mutation = """
+        mutation {
+          login(input: {password: "123123123", username: "testuser"}) {
+            ... on LoginSuccess {
+              token
+              refreshToken
+            }
+          }
+        }
+    """
+    refresh_token_mutation = """
+        mutation {
+          refreshToken(token: "%s") {
+            ... on ResultStatus {
+              statusCode
+            }
+            ... on LoginSuccess {
+              token
+              refreshToken
+            }
+          }
+        }
+    """
+    response = client.post(BASE_URL, json={"query": login_mutation})
+    refresh_token = response.json()["data"]["login"]["refreshToken"]
+    assert refresh_token is not None
+
+    stored = await db["refresh_tokens"].find_one({"username": user.username})
+    assert stored["token_hash"] != refresh_token
+
+    response = client.post(
+        BASE_URL,
+        json={"query": refresh_token_mutation % refresh_token}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    refreshed = response.json()["data"]["refreshToken"]
+    assert await auth_token(refreshed["token"]) == user
+    assert refreshed["refreshToken"] != refresh_token
+
+    response = client.post(
+        BASE_URL,
+        json={"query": refresh_token_mutation % refresh_token}
+    )
+    assert response.json()["data"]["refreshToken"]["statusCode"] == status.HTTP_401_UNAUTHORIZED
+
+    response = client.post(
+        BASE_URL,
+        json={"query": 'mutation { revokeRefreshToken(token: "%s") { statusCode } }'
+            % refreshed["refreshToken"]}
+    )
+    assert response.json()["data"]["revokeRefreshToken"]["statusCode"] == status.HTTP_204_NO_CONTENT
+    assert await db["refresh_tokens"].count_documents({}) == 0
+
+
+@pytest.mark.asyncio
+async def test_bulk_user_mutations(client: TestClient, user: User):
+    bulk_mutation = """
+        mutation {
+          %s {
+            ... on AffectedUsers {
+              affected
+            }
+            ... on ResultStatus {
+              statusCode
+            }
+          }
+        }
+    """
+    staff = [
+        User(username=f"staff{i}", passwd_hash=b"hash", permission=UserPermission.staff)
+        for i in range(3)
+    ]
+    for member in staff:
+        await db["users"].insert_one(
+            {**member.model_dump(mode="json"), "passwd_hash": "hash"}
+        )
+    staff_tokens = [await create_refresh_token(member) for member in staff[:2]]
+    user_token = await create_refresh_token(user)
+    token = await create_token(user)
+
+    def run(field: str) -> dict:
+        response = client.post(
+            BASE_URL,
+            json={"query": bulk_mutation % field},
+            headers={"Authorization": token},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        return response.json()["data"]
+
+    assert run("setPermissionWhere(filter: {}, permission: guest)") == {
+        "setPermissionWhere": {"statusCode": status.HTTP_400_BAD_REQUEST}
+    }
+    assert run("setPermissionWhere(filter: {permission: staff}, permission: guest)") == {
+        "setPermissionWhere": {"affected": 3}
+    }
+    assert await db["users"].count_documents({"permission": "guest"}) == 3
+    demoted = await db["users"].find_one({"username": "staff0"})
+    assert demoted["tokens_not_before"].endswith("Z")
+    for staff_token in staff_tokens:
+        assert await rotate_refresh_token(staff_token) is None
+    # Tokens issued after the change work again
+    assert await rotate_refresh_token(await create_refresh_token(staff[0]))
+    # The calling admin is never part of a bulk change
+    assert run("setPermissionWhere(filter: {usernames: [\"testuser\"]}, permission: guest)") == {
+        "setPermissionWhere": {"affected": 0}
+    }
+    _, user_token = await rotate_refresh_token(user_token)
+
+    assert run("deleteUsersWhere(filter: {usernames: [\"staff0\", \"staff1\"]})") == {
+        "deleteUsersWhere": {"affected": 2}
+    }
+    assert await db["users"].count_documents({}) == 2
+    # A new user with the name of a deleted one does not inherit its tokens
+    staff_token = await create_refresh_token(staff[1])
+    access_token = await create_token(staff[1])
+    recreated = await create_user(UserLogin(username="staff1", password="123123123"))
+    assert await rotate_refresh_token(staff_token) is None
+    assert await auth_token(access_token) is None
+    assert await auth_token(await create_token(recreated)) == recreated
+
+    event = await db["audit_events"].find_one({"action": "delete_users_where"})
+    assert event["changes"]["deleted"] == 2
+
+    response = client.post(
+        BASE_URL,
+        json={"query": bulk_mutation % "deleteUsersWhere(filter: {permission: guest})"},
+    )
+    assert response.json()["data"]["deleteUsersWhere"]["statusCode"] == (
+        status.HTTP_401_UNAUTHORIZED
+    )
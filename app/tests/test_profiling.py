@@ -0,0 +1,41 @@
+import time
+from pathlib import Path
+
+import orjson
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.tests.utils import BASE_URL, app, get_client
+from app.config import settings
+from app.profiling import ProfilingMiddleware, sign, verify
+
+pytest.importorskip("pyinstrument")
+
+articles_list_query = "{ articlesList { ... on ArticleListType { root { title } } } }"
+
+
+def test_verify():
+    now = int(time.time())
+    assert verify(sign(now))
+    assert not verify(sign(now - settings.PROFILING_SIGNATURE_TTL - 1))
+    assert not verify(f"{now}.invalid")
+    assert not verify("invalid")
+
+
+def test_profiling_middleware(client: TestClient, tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    profiled = TestClient(ProfilingMiddleware(app))
+
+    response = profiled.post(BASE_URL, json={"query": articles_list_query})
+    assert response.status_code == status.HTTP_200_OK
+    assert "x-profile-file" not in response.headers
+
+    response = profiled.post(
+        BASE_URL,
+        json={"query": articles_list_query},
+        headers={"X-Profile": sign(int(time.time()))},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    profile = orjson.loads(Path(response.headers["x-profile-file"]).read_bytes())
+    assert "speedscope" in profile["$schema"]
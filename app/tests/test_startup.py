@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.tests.utils import get_client
+from app.config import settings
+
+
+def import_times(module: str) -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=os.environ,
+    )
+    # Lines look like "import time: self [us] | cumulative | imported package",
+    # keep the self time of every module
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, _, name = line.removeprefix("import time:").split("|")
+        timings[name.strip()] = int(own)
+    return timings
+
+
+def test_import_time_budget():
+    # FastAPI, Strawberry and pymongo cost the same whatever the app does, the
+    # budget is for the work of our own modules: building the schema, the
+    # pydantic types and the client
+    timings = import_times("app.main")
+    microseconds = sum(
+        own for name, own in timings.items()
+        if name == "app" or name.startswith("app.")
+    )
+    assert microseconds / 1000 <= settings.IMPORT_TIME_BUDGET, (
+        f"app modules took {microseconds / 1000:.0f} ms to import, "
+        f"the budget is {settings.IMPORT_TIME_BUDGET} ms"
+    )
+
+
+def test_import_app_is_light():
+    # Only building the ASGI app may pull these in
+    modules = set(import_times("app"))
+    assert not modules & {"fastapi", "strawberry", "pymongo", "uvicorn"}
+
+
+def test_import_phase():
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import time\n"
+            "started = time.perf_counter()\n"
+            "from app import app, startup\n"
+            "print(startup.phases['import'], (time.perf_counter() - started) * 1000)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=os.environ,
+    )
+    phase, total = map(float, result.stdout.split())
+    # Building the app is nearly all of it, a second lookup must not reset it
+    assert phase >= total / 2
+
+
+def test_startup_report(client: TestClient):
+    from app import app, startup
+
+    # Entering the client runs the lifespan
+    with TestClient(app) as started:
+        response = started.get("/ready")
+    assert response.status_code == status.HTTP_200_OK
+    report = response.json()["startup"]
+    assert {"db_setup", "background"} <= set(report)
+    assert report == startup.phases
@@ -0,0 +1,115 @@
+import orjson
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.tests.utils import get_client, get_user
+from app.config import settings
+from app.database.db import db
+from app.database.models import User
+from app.database.utils import create_token
+
+
+def article_line(i: int) -> bytes:
+    return orjson.dumps({"title": f"title{i}", "author": "author", "body": "body"})
+
+
+@pytest.mark.asyncio
+async def test_import_export_articles(client: TestClient, user: User):
+    token = await create_token(user)
+    assert token is not None
+
+    lines = [article_line(i) for i in range(5)]
+    lines.insert(2, b'{"title": "missing author"}')
+    response = client.post(
+        "/import/articles",
+        content=b"\n".join(lines),
+        headers={"Authorization": token},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert result["inserted"] == 5
+    assert result["invalid"] == 1
+    assert result["errors"][0]["line"] == 3
+
+    response = client.get("/export/articles", headers={"Authorization": token})
+    assert response.status_code == status.HTTP_200_OK
+    exported = [orjson.loads(line) for line in response.content.splitlines()]
+    assert [article["title"] for article in exported] == [f"title{i}" for i in range(5)]
+
+    response = client.get(
+        "/export/articles",
+        params={"after": exported[2]["_id"]},
+        headers={"Authorization": token},
+    )
+    assert [orjson.loads(line)["title"] for line in response.content.splitlines()] == [
+        "title3",
+        "title4",
+    ]
+
+    await db["articles"].delete_many({"title": {"$in": ["title3", "title4"]}})
+    response = client.post(
+        "/import/articles",
+        params={"after": exported[1]["_id"]},
+        content=b"\n".join(orjson.dumps(article) for article in exported),
+        headers={"Authorization": token},
+    )
+    result = response.json()
+    assert result["inserted"] == 2
+    assert result["skipped"] == 3
+    assert result["last_id"] == exported[4]["_id"]
+    assert await db["articles"].count_documents({}) == 5
+
+
+def test_export_articles_unauthorized(client: TestClient):
+    response = client.get("/export/articles")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_article_body(client: TestClient, user: User, monkeypatch):
+    monkeypatch.setattr(settings, "BODY_EXTERNAL_THRESHOLD", 32)
+    monkeypatch.setattr(settings, "BODY_CHUNK_SIZE", 16)
+    token = await create_token(user)
+    body = "".join(f"{i:03d}" for i in range(40))
+
+    lines = [
+        orjson.dumps({"title": "long", "author": "author", "body": body}),
+        article_line(0),
+    ]
+    response = client.post(
+        "/import/articles",
+        content=b"\n".join(lines),
+        headers={"Authorization": token},
+    )
+    assert response.json()["inserted"] == 2
+
+    long = await db["articles"].find_one({"title": "long"})
+    short = await db["articles"].find_one({"title": "title0"})
+    assert long["body_id"] is not None
+    assert short["body_id"] is None
+    chunks = await db["article_bodies"].count_documents({})
+
+    # A retried import skips the rows it already wrote, bodies included
+    response = client.post(
+        "/import/articles",
+        content=b"\n".join(lines),
+        headers={"Authorization": token},
+    )
+    assert response.json()["inserted"] == 0
+    assert await db["article_bodies"].count_documents({}) == chunks
+
+    response = client.get(f"/articles/{long['_id']}/body")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.text == body
+    response = client.get(f"/articles/{long['_id']}/body?offset=10&length=25")
+    assert response.text == body[10:35]
+    response = client.get(f"/articles/{short['_id']}/body?offset=1&length=2")
+    assert response.text == "od"
+    response = client.get("/articles/missing/body")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = client.get("/export/articles", headers={"Authorization": token})
+    exported = [orjson.loads(line) for line in response.content.splitlines()]
+    assert exported[0]["body"] == body
+    assert "body_id" not in exported[0]
@@ -5,7 +5,7 @@ from fastapi.testclient import TestClient
 from pymongo import MongoClient
 
 from app.config import settings
-from app.database.db import _db_name
+from app.database.db import _db_name, client as db_client, run_db_setup
 from app.database.utils import create_user
 from app.database.models import UserLogin, UserPermission
 
@@ -19,6 +19,12 @@ BASE_URL = "/graphql/"
 
 @pytest.fixture(name="client")
 def get_client():
+    if settings.STORAGE_BACKEND == "memory":
+        asyncio.run(db_client.drop_database(_db_name))
+        asyncio.run(run_db_setup())
+        yield TestClient(app)
+        return
+
     with MongoClient(str(settings.mongo_dsn)) as client:
         if _db_name in client.list_database_names():
             client.drop_database(_db_name)
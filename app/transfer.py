@@ -0,0 +1,175 @@
+import orjson
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import APIRouter, Header, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
+
+from app.config import settings
+from app.database import repository
+from app.database.models import Article, UserPermission
+from app.database.repository import dump_document
+from app.database.utils import auth_token
+
+# Same limit as the maximum BSON document size
+MAX_LINE_BYTES = 16 * 1024 * 1024
+MAX_REPORTED_ERRORS = 100
+
+router = APIRouter()
+
+
+async def require_admin(token: str | None) -> None:
+    if token is None or await auth_token(token, UserPermission.admin) is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+
+
+def parse_cursor_token(after: str | None) -> ObjectId | None:
+    try:
+        return ObjectId(after) if after is not None else None
+    except InvalidId:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor token.",
+        )
+
+
+async def export_lines(after: ObjectId | None):
+    cursor = repository.articles.iterate(
+        after=after,
+        batch_size=settings.EXPORT_BATCH_SIZE,
+    )
+    async for document in cursor:
+        document["_id"] = str(document["_id"])
+        # Exports are self contained, inline bodies stored in article_bodies
+        body_id = document.pop("body_id", None)
+        document.pop("body_size", None)
+        if body_id is not None:
+            document["body"] = await repository.article_bodies.read(body_id)
+        yield orjson.dumps(document, option=orjson.OPT_APPEND_NEWLINE)
+
+
+async def request_lines(request: Request):
+    number, buffer = 0, b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > MAX_LINE_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Line is too long.",
+            )
+        for line in lines:
+            number += 1
+            yield number, line
+    yield number + 1, buffer
+
+
+def parse_article(line: bytes) -> dict:
+    row = orjson.loads(line)
+    id = row.pop("_id", None)
+
+    document = dump_document(Article(**row), exclude={"body_id", "body_size"})
+    if id is not None:
+        document["_id"] = ObjectId(id)
+    return document
+
+
+@router.get("/articles/{id}/body")
+async def article_body(
+    id: str,
+    offset: int = Query(default=0, ge=0),
+    length: int | None = Query(default=None, ge=0),
+):
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    found = await repository.articles.find(
+        {"_id": ObjectId(id)}, {"body": 1, "body_id": 1}
+    )
+    if not found:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    article = found[0]
+    if article.get("body_id") is None:
+        body = article.get("body") or ""
+        return PlainTextResponse(
+            body[offset:None if length is None else offset + length]
+        )
+    return StreamingResponse(
+        repository.article_bodies.stream(article["body_id"], offset, length),
+        media_type="text/plain; charset=utf-8",
+    )
+
+
+@router.get("/export/articles")
+async def export_articles(
+    after: str | None = None,
+    authorization: str | None = Header(default=None),
+) -> StreamingResponse:
+    await require_admin(authorization)
+
+    return StreamingResponse(
+        export_lines(parse_cursor_token(after)),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.post("/import/articles")
+async def import_articles(
+    request: Request,
+    after: str | None = None,
+    authorization: str | None = Header(default=None),
+) -> dict:
+    await require_admin(authorization)
+    resume_after = parse_cursor_token(after)
+
+    inserted = skipped = invalid = 0
+    errors = []
+    last_id = None
+    batch = []
+
+    async for number, line in request_lines(request):
+        if not line.strip():
+            continue
+
+        try:
+            document = parse_article(line)
+        except (
+            orjson.JSONDecodeError,
+            ValidationError,
+            InvalidId,
+            TypeError,
+            AttributeError,
+        ) as e:
+            invalid += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": number, "error": str(e)})
+            continue
+
+        if (
+            resume_after is not None and
+            "_id" in document and
+            document["_id"] <= resume_after
+        ):
+            skipped += 1
+            continue
+
+        batch.append(document)
+        if len(batch) >= settings.IMPORT_BATCH_SIZE:
+            count, duplicates = await repository.articles.insert_many(batch)
+            inserted, skipped = inserted + count, skipped + duplicates
+            last_id = batch[-1]["_id"]
+            batch = []
+
+    count, duplicates = await repository.articles.insert_many(batch)
+    inserted, skipped = inserted + count, skipped + duplicates
+    if batch:
+        last_id = batch[-1]["_id"]
+
+    return {
+        "inserted": inserted,
+        "skipped": skipped,
+        "invalid": invalid,
+        "errors": errors,
+        "last_id": str(last_id) if last_id is not None else None,
+    }
@@ -0,0 +1,80 @@
+"""Compare the pydantic and the fast-path conversion of list results.
+
+    python -m benchmarks.list_serialization [rows]
+"""
+import asyncio
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+from bson import ObjectId
+
+from app.database.db import db, run_db_setup
+from app.database.models import ArticleList
+from app.schema.depends import ArticleListType, article_list_from_documents
+from app.schema.schema import schema
+
+ARTICLES_LIST_QUERY = """
+    query {
+      articlesList {
+        ... on ArticleListType {
+          root { _id title author pubDate modDate }
+        }
+      }
+    }
+"""
+
+
+def make_documents(rows: int) -> list[dict]:
+    started = datetime(2025, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"article {i}",
+            "author": f"author{i % 100}",
+            "pub_date": (started + timedelta(minutes=i)).isoformat(),
+            "mod_date": (started + timedelta(minutes=i, seconds=30)).isoformat(),
+        }
+        for i in range(rows)
+    ]
+
+
+def report(name: str, seconds: float, rows: int) -> None:
+    print(f"{name:<32}{seconds * 1000:>10.2f} ms{seconds / rows * 1e6:>10.2f} us/row")
+
+
+async def main(rows: int) -> None:
+    documents = make_documents(rows)
+    runs = 5
+
+    pydantic_time = min(timeit.repeat(
+        lambda: ArticleListType.from_pydantic(ArticleList(root=documents)),
+        number=1,
+        repeat=runs,
+    ))
+    fast_time = min(timeit.repeat(
+        lambda: article_list_from_documents(documents),
+        number=1,
+        repeat=runs,
+    ))
+    report("pydantic conversion", pydantic_time, rows)
+    report("fast-path conversion", fast_time, rows)
+
+    await run_db_setup()
+    await db["articles"].insert_many(documents)
+
+    loop = asyncio.get_running_loop()
+    timings = []
+    for _ in range(runs):
+        started = loop.time()
+        result = await schema.execute(ARTICLES_LIST_QUERY)
+        timings.append(loop.time() - started)
+        assert result.errors is None
+    report("articlesList execution", min(timings), rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000))
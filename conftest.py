@@ -0,0 +1,5 @@
+import os
+
+# Run the suite against the in-memory storage unless a backend is chosen.
+# This has to happen before `app` is imported and reads its settings.
+os.environ.setdefault("STORAGE_BACKEND", "memory")